@@ -0,0 +1,198 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.runner import run_benchmarks, compare, time_startup, over_budget, STARTUP_BUDGETS
+from benchmarks.differential import Engine, DifferentialError, REPOSITORY, export_revision, compare_engines, fuzz
+from argparse import ArgumentParser
+import tempfile
+import pathlib
+import json
+import sys
+
+def cmd_generate(args) -> int:
+    generator = CorpusGenerator(
+        seed=args.seed,
+        functions=args.functions,
+        function_lines=args.function_lines
+    )
+    description = generator.generate(args.dest, files=args.files)
+    print(json.dumps(description))
+    return 0
+
+def cmd_run(args) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = pathlib.Path(tmp)
+            CorpusGenerator(seed=args.seed).generate(corpus, files=args.files)
+
+        results = run_benchmarks(corpus, repeat=args.repeat, cli_repeat=args.cli_repeat)
+
+    output = json.dumps(results, indent=4)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output)
+
+    for name, seconds in sorted(results["checks"].items()):
+        print(f"{name:<28} {seconds * 1000:10.2f} ms", file=sys.stderr)
+    for name, seconds in sorted(results["cli"].items()):
+        print(f"{'cli.' + name:<28} {seconds * 1000:10.2f} ms", file=sys.stderr)
+    for name, seconds in sorted(results["startup"].items()):
+        print(f"{'startup.' + name:<28} {seconds * 1000:10.2f} ms", file=sys.stderr)
+
+    return 0
+
+def cmd_startup(args) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        CorpusGenerator(seed=args.seed).generate(pathlib.Path(tmp), files=1)
+        path = next(pathlib.Path(tmp).glob("**/*.c"))
+        startup = time_startup(path, repeat=args.repeat)
+
+    budgets = dict(STARTUP_BUDGETS)
+    if args.budget is not None:
+        budgets = {name: args.budget / 1000 for name in budgets}
+
+    exceeded = {name for name, _, _ in over_budget(startup, budgets)}
+    for name, seconds in sorted(startup.items()):
+        marker = "OVER BUDGET" if name in exceeded else ""
+        print(f"{name:<28} {seconds * 1000:10.2f} ms {budgets[name] * 1000:10.2f} ms {marker}")
+
+    return 1 if len(exceeded) > 0 else 0
+
+def cmd_compare(args) -> int:
+    old = json.loads(args.old.read_text())
+    new = json.loads(args.new.read_text())
+
+    regressions = 0
+    for name, old_seconds, new_seconds, regressed in compare(old, new, args.threshold):
+        change = (new_seconds / old_seconds - 1) * 100 if old_seconds > 0 else 0
+        marker = "REGRESSION" if regressed else ""
+        print(f"{name:<32} {old_seconds * 1000:10.2f} ms {new_seconds * 1000:10.2f} ms {change:+7.1f}% {marker}")
+        if regressed:
+            regressions += 1
+
+    return 1 if regressions > 0 else 0
+
+def print_differences(filename: str, missing: list, extra: list):
+    print(f"{filename}: {len(missing)} missing, {len(extra)} extra")
+    for kind, messages in (("-", missing), ("+", extra)):
+        for _, line, severity, message in messages:
+            print(f"  {kind} {severity}: {line}: {message}")
+
+def cmd_diff(args) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        try:
+            if args.reference_dir is not None:
+                reference = Engine("reference", args.reference_dir)
+            else:
+                reference = Engine(f"reference ({args.reference})", export_revision(args.reference, tmp / "reference"))
+            candidate = Engine("candidate", args.candidate)
+
+            corpus = args.corpus
+            if corpus is None:
+                corpus = tmp / "corpus"
+                CorpusGenerator(seed=args.seed).generate(corpus, files=args.files)
+
+            differences, times = compare_engines(reference, candidate, [corpus.resolve()], args.repeat)
+            mismatches = fuzz(reference, candidate, args.seed, args.fuzz, args.fuzz_files) if args.fuzz > 0 else list()
+        except DifferentialError as e:
+            print(e, file=sys.stderr)
+            return 2
+
+    for name, seconds in times.items():
+        print(f"{name:<28} {seconds * 1000:10.2f} ms")
+    reference_time, candidate_time = times[reference.name], times[candidate.name]
+    if candidate_time > 0:
+        print(f"{'speedup':<28} {reference_time / candidate_time:10.2f} x")
+
+    for filename, (missing, extra) in sorted(differences.items()):
+        print_differences(filename, missing, extra)
+
+    for name, contents, (missing, extra) in mismatches:
+        print_differences(name, missing, extra)
+        if args.cases is not None:
+            args.cases.mkdir(parents=True, exist_ok=True)
+            (args.cases / name).write_text(contents, encoding="utf-8")
+        else:
+            print("\n".join(f"  | {line}" for line in contents.split("\n")))
+
+    print(f"{len(differences)} corpus files and {len(mismatches)} fuzzed sources differ", file=sys.stderr)
+    return 1 if len(differences) > 0 or len(mismatches) > 0 else 0
+
+def main():
+    arg_parser = ArgumentParser(description="Moulinorme benchmarks")
+    subparsers = arg_parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    generate = subparsers.add_parser("generate", help="Generate a synthetic corpus")
+    generate.add_argument(dest="dest", type=pathlib.Path, help="Destination folder")
+    generate.add_argument("-n", "--files", dest="files", type=int, default=100, help="Number of source files")
+    generate.add_argument("-s", "--seed", dest="seed", type=int, default=0, help="Random seed")
+    generate.add_argument("--functions", dest="functions", type=int, default=8, help="Functions per source file")
+    generate.add_argument("--function-lines", dest="function_lines", type=int, default=25, help="Lines per function")
+    generate.set_defaults(func=cmd_generate)
+
+    run = subparsers.add_parser("run", help="Time the checks and the CLI")
+    run.add_argument("-c", "--corpus", dest="corpus", type=pathlib.Path, default=None, help="Corpus to use (a generated one by default)")
+    run.add_argument("-n", "--files", dest="files", type=int, default=100, help="Number of source files of the generated corpus")
+    run.add_argument("-s", "--seed", dest="seed", type=int, default=0, help="Random seed of the generated corpus")
+    run.add_argument("-r", "--repeat", dest="repeat", type=int, default=5, help="Repetitions of each check")
+    run.add_argument("--cli-repeat", dest="cli_repeat", type=int, default=3, help="Repetitions of the CLI run")
+    run.add_argument("-o", "--output", dest="output", type=pathlib.Path, default=None, help="Save results to this JSON file")
+    run.set_defaults(func=cmd_run)
+
+    startup = subparsers.add_parser("startup", help="Time the CLI startup, fails if it exceeds its budget")
+    startup.add_argument("-r", "--repeat", dest="repeat", type=int, default=10, help="Repetitions of each run")
+    startup.add_argument("-s", "--seed", dest="seed", type=int, default=0, help="Random seed of the checked file")
+    startup.add_argument("-b", "--budget", dest="budget", type=float, default=None, metavar="MS", help="Budget of every scenario in milliseconds over a bare interpreter startup (default: per scenario budgets)")
+    startup.set_defaults(func=cmd_startup)
+
+    diff = subparsers.add_parser("diff", help="Compare the violations reported by a candidate implementation with a reference one and time both")
+    diff.add_argument("-R", "--reference", dest="reference", default="HEAD", metavar="REV", help="Git revision of the reference implementation (default: HEAD)")
+    diff.add_argument("--reference-dir", dest="reference_dir", type=pathlib.Path, default=None, metavar="DIR", help="Directory of the moulinorme package of the reference implementation (instead of --reference)")
+    diff.add_argument("--candidate", dest="candidate", type=pathlib.Path, default=REPOSITORY, metavar="DIR", help="Directory of the moulinorme package of the candidate implementation (default: this working tree)")
+    diff.add_argument("-c", "--corpus", dest="corpus", type=pathlib.Path, default=None, help="Corpus to use (a generated one by default)")
+    diff.add_argument("-n", "--files", dest="files", type=int, default=100, help="Number of source files of the generated corpus")
+    diff.add_argument("-s", "--seed", dest="seed", type=int, default=0, help="Random seed of the generated corpus and of the fuzzer")
+    diff.add_argument("-r", "--repeat", dest="repeat", type=int, default=3, help="Repetitions of the corpus check")
+    diff.add_argument("--fuzz", dest="fuzz", type=int, default=0, metavar="N", help="Also compare N batches of random sources, shrinking the ones they disagree on")
+    diff.add_argument("--fuzz-files", dest="fuzz_files", type=int, default=20, metavar="N", help="Random sources per batch (default: 20)")
+    diff.add_argument("--cases", dest="cases", type=pathlib.Path, default=None, metavar="DIR", help="Save the shrunk sources to this folder instead of printing them")
+    diff.set_defaults(func=cmd_diff)
+
+    cmp = subparsers.add_parser("compare", help="Compare two saved results")
+    cmp.add_argument(dest="old", type=pathlib.Path, help="Reference results")
+    cmp.add_argument(dest="new", type=pathlib.Path, help="New results")
+    cmp.add_argument("-t", "--threshold", dest="threshold", type=float, default=0.1, help="Tolerated slowdown ratio (default: 0.1)")
+    cmp.set_defaults(func=cmd_compare)
+
+    args = arg_parser.parse_args()
+    return args.func(args)
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,197 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import pathlib
+import random
+
+TYPES = ("int", "char", "void", "size_t", "long", "char *", "int *", "double")
+NAMES = ("my", "str", "list", "node", "buffer", "parse", "get", "set", "print", "free", "init", "count")
+
+# Fragments inserted in the lines of fuzzed sources, mostly the characters
+# and keywords the checks look for
+FRAGMENTS = (
+    "\t", " ", "    ", "{", "}", "(", ")", ";", ",", "/*", "*/", "//", "\"", "'", "\\",
+    "if", "while ", "for(", "return", "else", "#include <stdio.h>", "#include \"x.c\"",
+    "int f(void)", "static ", "/* x */", "\"a // b\"", "é", "\u00a0", " " * 90
+)
+
+class CorpusGenerator:
+    """Generate reproducible Epitech-style C/H/Makefile corpora
+
+    The same seed and parameters always generate the same files. Sources
+    mix regular code with the inputs that are expensive to check: files
+    with many functions, very long lines, deeply nested blocks, lines
+    holding many string literals and tab indentation.
+    """
+
+    def __init__(self, seed: int = 0, functions: int = 8, function_lines: int = 25,
+                 long_line_ratio: float = 0.02, string_ratio: float = 0.1,
+                 tab_ratio: float = 0.05, max_depth: int = 6):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.functions = functions
+        self.function_lines = function_lines
+        self.long_line_ratio = long_line_ratio
+        self.string_ratio = string_ratio
+        self.tab_ratio = tab_ratio
+        self.max_depth = max_depth
+
+    def identifier(self) -> str:
+        return "_".join(self.rng.choice(NAMES) for _ in range(self.rng.randint(1, 3)))
+
+    def header(self, description: str, mark_start="/*", mark_mid="**", mark_end="*/") -> list:
+        return [
+            mark_start,
+            f"{mark_mid} EPITECH PROJECT, {self.rng.randint(2015, 2024)}",
+            f"{mark_mid} {self.identifier()}",
+            f"{mark_mid} File description:",
+            f"{mark_mid} {description}",
+            mark_end,
+            ""
+        ]
+
+    def prototype(self) -> str:
+        args = ", ".join(f"{self.rng.choice(TYPES)} {self.identifier()}" for _ in range(self.rng.randint(0, 5)))
+        return f"{self.rng.choice(TYPES)} {self.identifier()}({args or 'void'})"
+
+    def statement(self, depth: int) -> str:
+        indent = "    " * depth
+        if self.rng.random() < self.tab_ratio:
+            indent = "\t" * depth
+
+        roll = self.rng.random()
+        if roll < self.string_ratio:
+            literals = ", ".join(f'"{self.identifier()} // %d /* x */"' for _ in range(self.rng.randint(2, 12)))
+            line = f"{indent}my_printf({literals});"
+        elif roll < self.string_ratio + self.long_line_ratio:
+            line = f"{indent}{self.identifier()} = " + " + ".join(self.identifier() for _ in range(self.rng.randint(10, 60))) + ";"
+        else:
+            line = f"{indent}{self.identifier()} = {self.identifier()}({self.rng.randint(0, 99)});"
+
+        if self.rng.random() < 0.05:
+            line += " "
+
+        return line
+
+    def body(self, depth: int = 1, lines: int = None) -> list:
+        lines = self.function_lines if lines is None else lines
+        body = list()
+        while len(body) < lines:
+            indent = "    " * depth
+            roll = self.rng.random()
+            if roll < 0.15 and depth < self.max_depth:
+                keyword = self.rng.choice(("if", "while", "for", "switch"))
+                space = " " if self.rng.random() < 0.8 else ""
+                body.append(f"{indent}{keyword}{space}({self.identifier()}) {{")
+                body += self.body(depth + 1, self.rng.randint(1, 4))
+                body.append(f"{indent}}}")
+            elif roll < 0.17:
+                body.append(f"{indent}// {self.identifier()}")
+            else:
+                body.append(self.statement(depth))
+
+        body.append(f"    return{self.rng.choice((' ', ''))}(0);")
+        return body
+
+    def c_file(self) -> str:
+        lines = self.header("source file")
+        for header in range(self.rng.randint(1, 4)):
+            lines.append(f'#include "{self.identifier()}.h"')
+        lines.append("")
+
+        for _ in range(self.functions):
+            lines.append(self.prototype())
+            lines.append("{")
+            lines += self.body()
+            lines.append("}")
+            lines.append("")
+
+        return "\n".join(lines)
+
+    def h_file(self) -> str:
+        lines = self.header("header file")
+        lines += ["#ifndef MY_H_", "    #define MY_H_", ""]
+        lines += [f"{self.prototype()};" for _ in range(self.functions * 4)]
+        lines += ["", "#endif"]
+
+        return "\n".join(lines)
+
+    def makefile(self) -> str:
+        lines = self.header("Makefile", "##", "##", "##")
+        lines += ["SRC\t=\t$(wildcard src/*.c)", "", "all:", "\tgcc -o a.out $(SRC)"]
+
+        return "\n".join(lines)
+
+    def fuzz_file(self, header: bool = False, mutations: int = 10) -> str:
+        """Returns a C (or header) source with up to mutations random line
+        edits (deletions, duplications, swaps and inserted fragments)"""
+
+        lines = (self.h_file() if header else self.c_file()).split("\n")
+        for _ in range(self.rng.randint(1, mutations)):
+            i = self.rng.randrange(len(lines))
+            roll = self.rng.random()
+            if roll < 0.2 and len(lines) > 1:
+                del lines[i]
+            elif roll < 0.3:
+                lines.insert(i, lines[i])
+            elif roll < 0.4:
+                j = self.rng.randrange(len(lines))
+                lines[i], lines[j] = lines[j], lines[i]
+            else:
+                position = self.rng.randint(0, len(lines[i]))
+                lines[i] = lines[i][:position] + self.rng.choice(FRAGMENTS) + lines[i][position:]
+
+        return "\n".join(lines)
+
+    def generate(self, dest: pathlib.Path, files: int = 100, dirs: int = 4) -> dict:
+        """Write a corpus of files sources to dest, returns its description"""
+
+        dest = pathlib.Path(dest)
+        dest.mkdir(parents=True, exist_ok=True)
+        (dest / "Makefile").write_text(self.makefile())
+
+        total_bytes = 0
+        total_lines = 0
+        for i in range(files):
+            directory = dest / "src" / f"module_{i % max(dirs, 1)}"
+            directory.mkdir(parents=True, exist_ok=True)
+
+            if i % 5 == 4:
+                filename = directory / f"header_{i}.h"
+                contents = self.h_file()
+            else:
+                filename = directory / f"source_{i}.c"
+                contents = self.c_file()
+
+            filename.write_text(contents)
+            total_bytes += len(contents)
+            total_lines += contents.count("\n") + 1
+
+        return {
+            "seed": self.seed,
+            "files": files + 1,
+            "lines": total_lines,
+            "bytes": total_bytes
+        }
@@ -0,0 +1,222 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from benchmarks.corpus import CorpusGenerator
+import collections
+import subprocess
+import tempfile
+import tarfile
+import pathlib
+import time
+import sys
+import io
+import os
+import re
+
+# Source tree of these benchmarks, the default candidate implementation
+REPOSITORY = pathlib.Path(__file__).resolve().parent.parent
+
+# Line of the text output of every Moulinorme version: "Major: file:12: message"
+MESSAGE_RE = re.compile(r"^(\w+): (.+?):(\d+): (.*)$")
+
+class DifferentialError(Exception):
+    pass
+
+def export_revision(revision: str, dest: pathlib.Path, repository: pathlib.Path = REPOSITORY) -> pathlib.Path:
+    """Extract the moulinorme package of a git revision to dest, returns
+    dest"""
+
+    archive = subprocess.run(
+        ["git", "-C", str(repository), "archive", "--format=tar", revision, "moulinorme"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    if archive.returncode != 0:
+        raise DifferentialError(f"git archive {revision}: {archive.stderr.decode(errors='replace').strip()}")
+
+    with tarfile.open(fileobj=io.BytesIO(archive.stdout)) as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(str(dest), filter="data")
+        else:
+            tar.extractall(str(dest))
+
+    return dest
+
+class Engine:
+    """Moulinorme implementation whose package is in directory, run in a
+    subprocess so that any version can be compared with any other"""
+
+    def __init__(self, name: str, directory: pathlib.Path):
+        self.name = name
+        self.directory = pathlib.Path(directory).resolve()
+
+    def check(self, paths: list) -> tuple:
+        """Perform a delivery check of paths, returns the reported messages
+        as a Counter of (filename, line, severity, message) and the wall
+        time of the check
+
+        If the engine crashes the paths are checked one by one, a file it
+        crashes on gets a single "Crash" message with the exception.
+        """
+
+        # A fresh cache directory makes sure that no engine replays the
+        # results of another one
+        with tempfile.TemporaryDirectory() as cache_dir:
+            env = dict(os.environ, PYTHONPATH=str(self.directory), XDG_CACHE_HOME=cache_dir)
+            command = [sys.executable, "-m", "moulinorme", "-n", "-d"] + [str(path) for path in paths]
+
+            start = time.perf_counter()
+            process = subprocess.run(
+                command,
+                cwd=str(self.directory),
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True
+            )
+            elapsed = time.perf_counter() - start
+
+        if process.returncode not in (0, 1) or "Traceback" in process.stderr:
+            if len(paths) > 1:
+                messages = collections.Counter()
+                for path in paths:
+                    messages += self.check([path])[0]
+                return messages, elapsed
+
+            if not pathlib.Path(paths[0]).is_file():
+                raise DifferentialError(f"{self.name} failed:\n{process.stderr.strip()}")
+
+            error = process.stderr.strip().splitlines()[-1:] or [f"exit status {process.returncode}"]
+            return collections.Counter([(str(paths[0]), 0, "Crash", error[0])]), elapsed
+
+        messages = collections.Counter()
+        for line in process.stdout.splitlines():
+            match = MESSAGE_RE.match(line)
+            if match:
+                severity, filename, line_nb, message = match.groups()
+                messages[(filename, int(line_nb), severity, message)] += 1
+
+        return messages, elapsed
+
+def diff_messages(reference: collections.Counter, candidate: collections.Counter) -> dict:
+    """Returns the {filename: (missing, extra)} messages of the files whose
+    messages differ between reference and candidate"""
+
+    differences = dict()
+    for kind, messages in enumerate((reference - candidate, candidate - reference)):
+        for message in sorted(messages.elements()):
+            differences.setdefault(message[0], (list(), list()))[kind].append(message)
+
+    return differences
+
+def compare_engines(reference: Engine, candidate: Engine, paths: list, repeat: int = 1) -> tuple:
+    """Check paths with both engines repeat times (alternating them)
+
+    Returns the differences (see diff_messages()) and the best wall time
+    of each engine.
+    """
+
+    times = {reference.name: None, candidate.name: None}
+    results = dict()
+    for _ in range(max(repeat, 1)):
+        for engine in (reference, candidate):
+            results[engine.name], elapsed = engine.check(paths)
+            best = times[engine.name]
+            times[engine.name] = elapsed if best is None else min(best, elapsed)
+
+    return diff_messages(results[reference.name], results[candidate.name]), times
+
+def shrink(reference: Engine, candidate: Engine, name: str, contents: str, max_rounds: int = 200) -> str:
+    """Delete lines of a source file for as long as both engines still
+    disagree on it, returns the smallest contents found
+
+    Every round checks all the ways of deleting a chunk of lines in a single
+    run of each engine, chunks are halved when no deletion keeps the
+    mismatch.
+    """
+
+    lines = contents.split("\n")
+    chunk = max(len(lines) // 2, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp).resolve()
+        for round_nb in range(max_rounds):
+            if len(lines) <= 1:
+                break
+
+            variants = [lines[:i] + lines[i + chunk:] for i in range(0, len(lines), chunk)]
+            paths = list()
+            for i, variant in enumerate(variants):
+                path = tmp / str(round_nb) / str(i) / name
+                path.parent.mkdir(parents=True)
+                path.write_text("\n".join(variant), encoding="utf-8")
+                paths.append(path)
+
+            differences, _ = compare_engines(reference, candidate, paths)
+            failing = [i for i, path in enumerate(paths) if str(path) in differences]
+            if len(failing) > 0:
+                lines = variants[failing[0]]
+                chunk = min(chunk, max(len(lines) // 2, 1))
+            elif chunk > 1:
+                chunk //= 2
+            else:
+                break
+
+    return "\n".join(lines)
+
+def fuzz(reference: Engine, candidate: Engine, seed: int = 0, iterations: int = 10, files: int = 20) -> list:
+    """Check random sources with both engines
+
+    Returns the (name, contents, differences) of the sources they disagree
+    on, with the contents shrunk to a minimal case.
+    """
+
+    generator = CorpusGenerator(seed=seed, functions=3, function_lines=8)
+    mismatches = list()
+    for iteration in range(iterations):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = pathlib.Path(tmp).resolve()
+            sources = dict()
+            for i in range(files):
+                header = generator.rng.random() < 0.2
+                name = f"fuzz_{iteration}_{i}.{'h' if header else 'c'}"
+                contents = generator.fuzz_file(header)
+                path = tmp / name
+                path.write_text(contents, encoding="utf-8")
+                sources[str(path)] = (name, contents)
+
+            differences, _ = compare_engines(reference, candidate, [pathlib.Path(path) for path in sources])
+            for filename in sorted(differences):
+                if filename not in sources:
+                    continue
+
+                name, contents = sources[filename]
+                contents = shrink(reference, candidate, name, contents)
+                with tempfile.TemporaryDirectory() as case_dir:
+                    path = pathlib.Path(case_dir).resolve() / name
+                    path.write_text(contents, encoding="utf-8")
+                    case_differences, _ = compare_engines(reference, candidate, [path])
+                mismatches.append((name, contents, case_differences.get(str(path), (list(), list()))))
+
+    return mismatches
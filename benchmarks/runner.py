@@ -0,0 +1,205 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.runner import source_file_class
+from moulinorme.source import CFileDefs, CFile
+import moulinorme
+import subprocess
+import platform
+import pathlib
+import time
+import sys
+import os
+
+def _run_check_function(src_file):
+    for function in src_file.functions:
+        src_file.check_function(function)
+
+# Public checks timed by the runner: (name, applies to, setup, timed call)
+CHECKS = (
+    ("read", None, None, None),
+    ("check_header", None, None, lambda f: f.check_header()),
+    ("check_columns", None, None, lambda f: f.check_columns()),
+    ("check_indent", CFileDefs, None, lambda f: f.check_indent()),
+    ("check_trailing_whitespace", CFileDefs, None, lambda f: f.check_trailing_whitespace()),
+    ("check_includes", CFileDefs, None, lambda f: f.check_includes()),
+    ("check_line_rules", CFileDefs, None, lambda f: f.check_line_rules()),
+    ("extract_functions", CFileDefs, None, lambda f: f.extract_functions()),
+    ("check_function", CFile, lambda f: f.extract_functions(), _run_check_function),
+    ("check_file", None, None, lambda f: f.check_file())
+)
+
+def corpus_files(corpus: pathlib.Path) -> list:
+    """Returns the (path, SourceFile class) of the checked files of a corpus"""
+
+    files = list()
+    for root, dirs, filenames in os.walk(corpus):
+        dirs.sort()
+        for filename in sorted(filenames):
+            cls = source_file_class(filename)
+            if cls is not None:
+                files.append((pathlib.Path(root) / filename, cls))
+
+    return files
+
+def time_checks(corpus: pathlib.Path, repeat: int = 5) -> dict:
+    """Time each public check over every file of the corpus
+
+    Each check runs on a fresh SourceFile, the best total time out of
+    repeat runs is kept for every check.
+    """
+
+    files = corpus_files(corpus)
+    results = dict()
+
+    for name, applies_to, setup, call in CHECKS:
+        best = None
+        for _ in range(repeat):
+            total = 0.0
+            for path, cls in files:
+                if applies_to is not None and not issubclass(cls, applies_to):
+                    continue
+
+                start = time.perf_counter()
+                src_file = cls(path)
+                if call is None:
+                    total += time.perf_counter() - start
+                    continue
+
+                if setup is not None:
+                    setup(src_file)
+
+                start = time.perf_counter()
+                call(src_file)
+                total += time.perf_counter() - start
+
+            best = total if best is None else min(best, total)
+
+        results[name] = best
+
+    return results
+
+def time_cli(corpus: pathlib.Path, repeat: int = 3, args=()) -> float:
+    """Returns the best wall time of a full delivery check of the corpus"""
+
+    command = [sys.executable, "-m", "moulinorme", "-d", "--no-cache"] + list(args) + [str(corpus)]
+    return _best_time(command, repeat)
+
+# CLI startup scenarios: (name, arguments) where "{file}" is replaced by the
+# path of a source file, and the budget of each one in seconds on top of the
+# startup time of a bare interpreter
+STARTUP_SCENARIOS = (
+    ("version", ["-V"]),
+    ("no_input", []),
+    ("single_file", ["-n", "--no-cache", "{file}"])
+)
+STARTUP_BUDGETS = {
+    "version": 0.050,
+    "no_input": 0.050,
+    "single_file": 0.100
+}
+
+def _best_time(command: list, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+def time_startup(path: pathlib.Path, repeat: int = 10) -> dict:
+    """Returns the best wall time of each startup scenario (checking path
+    for single_file), minus the best startup time of a bare interpreter"""
+
+    interpreter = _best_time([sys.executable, "-c", "pass"], repeat)
+    results = dict()
+    for name, args in STARTUP_SCENARIOS:
+        command = [sys.executable, "-m", "moulinorme"] + [arg.replace("{file}", str(path)) for arg in args]
+        results[name] = max(_best_time(command, repeat) - interpreter, 0.0)
+
+    return results
+
+def over_budget(startup: dict, budgets: dict = None) -> list:
+    """Returns the (name, seconds, budget) of the startup scenarios that
+    exceed their budget"""
+
+    budgets = STARTUP_BUDGETS if budgets is None else budgets
+    return [
+        (name, seconds, budgets[name])
+        for name, seconds in sorted(startup.items())
+        if name in budgets and seconds > budgets[name]
+    ]
+
+def run_benchmarks(corpus: pathlib.Path, repeat: int = 5, cli_repeat: int = 3) -> dict:
+    """Run all benchmarks on a corpus, returns results that can be saved as JSON"""
+
+    files = corpus_files(corpus)
+    return {
+        "moulinorme": moulinorme.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": {
+            "path": str(corpus),
+            "files": len(files),
+            "bytes": sum(path.stat().st_size for path, _ in files)
+        },
+        "checks": time_checks(corpus, repeat),
+        "cli": {
+            "serial": time_cli(corpus, cli_repeat),
+            "parallel": time_cli(corpus, cli_repeat, ["-j", "auto"])
+        },
+        "startup": time_startup(files[0][0], cli_repeat * 3)
+    }
+
+def flatten(results: dict) -> dict:
+    """Returns the timings of benchmark results as a flat name: seconds dictionary"""
+
+    timings = dict()
+    for key in ("checks", "cli", "startup"):
+        for name, seconds in results.get(key, dict()).items():
+            timings[f"{key}.{name}"] = seconds
+
+    return timings
+
+def compare(old: dict, new: dict, threshold: float = 0.1) -> list:
+    """Compare two benchmark results
+
+    Returns (name, old seconds, new seconds, regressed) tuples, a timing
+    regressed when it is slower than the old one by more than threshold.
+    """
+
+    old_timings = flatten(old)
+    new_timings = flatten(new)
+
+    comparison = list()
+    for name in sorted(set(old_timings).intersection(new_timings)):
+        old_seconds = old_timings[name]
+        new_seconds = new_timings[name]
+        regressed = old_seconds > 0 and new_seconds > old_seconds * (1 + threshold)
+        comparison.append((name, old_seconds, new_seconds, regressed))
+
+    return comparison
@@ -29,5 +29,28 @@ VERSION_PATCH = 0
 
 __version__ = f"{VERSION_MAJOR}.{VERSION_MINOR}.{VERSION_PATCH}"
 
-import moulinorme.types
-from moulinorme.source import SourceFile, Makefile, HFile, CFile
\ No newline at end of file
+# Submodules and the SourceFile classes are only imported when first used,
+# so that importing the package (and starting the CLI) stays fast
+_LAZY_ATTRIBUTES = {
+    "SourceFile": "moulinorme.source",
+    "Makefile": "moulinorme.source",
+    "HFile": "moulinorme.source",
+    "CFile": "moulinorme.source"
+}
+
+def __getattr__(name):
+    import importlib
+
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is not None:
+        value = getattr(importlib.import_module(module_name), name)
+    else:
+        try:
+            value = importlib.import_module(f"{__name__}.{name}")
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(f"module '{__name__}' has no attribute '{name}'") from None
+
+    globals()[name] = value
+    return value
\ No newline at end of file
@@ -23,98 +23,411 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+# Only the modules needed to parse the command line are imported here, the
+# checker modules are imported by the functions using them so that -V and
+# errors on the command line exit before loading them
 import sys
 import pathlib
-import re
-from argparse import ArgumentParser
+import itertools
+from argparse import ArgumentParser, ArgumentTypeError
 import moulinorme
-from moulinorme.types import TermStyle
+from moulinorme.reader import ENCODING_ERRORS
+from moulinorme.rules import RuleSet, parse_rule_list
+from moulinorme.report import REPORTERS
 
-def explore_path(target: pathlib.Path, recursive=False):
-    """Explore paths add return a list of files found"""
-    targets = list()
+def jobs_count(value: str) -> int:
+    """Parse the --jobs argument, "auto" uses one worker per CPU"""
 
-    if target.is_dir():
-        for sub in target.iterdir():
-            if sub.name.startswith("."):
-                continue
+    if value == "auto":
+        return 0
 
-            if sub.is_dir():
-                if recursive:
-                    targets += explore_path(sub, recursive)
-            else:
-                targets.append(sub)
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid jobs count: '{value}'")
+
+    if jobs < 0:
+        raise ArgumentTypeError(f"invalid jobs count: '{value}'")
+
+    return jobs
+
+def rule_list(value: str) -> list:
+    """Parse the --select and --ignore arguments"""
+
+    try:
+        return parse_rule_list(value)
+    except ValueError as e:
+        raise ArgumentTypeError(str(e))
+
+def git_targets(args, cwd: pathlib.Path, config=None):
+    """Returns the targets of the files changed according to args.since and
+    args.staged, and their changed lines (None unless args.changed_lines)
+
+    Files excluded by config are skipped.
+    """
+
+    from moulinorme.walk import path_skipped, IgnoreRules
+    from moulinorme.git import repository_root, changed_files, changed_lines, changed_targets
+
+    root = repository_root(cwd)
+    pathspecs = [str((cwd / pathlib.Path(filename).expanduser()).resolve()) for filename in args.files]
+
+    rules = IgnoreRules() if config is None else config.exclude_rules()
+    rules = rules.extend(str(root), args.exclude)
+    names = [
+        name for name in changed_files(root, args.since, args.staged, pathspecs)
+        if not path_skipped(rules, str(root), name)
+    ]
+
+    lines = None
+    if args.changed_lines:
+        line_nbs = changed_lines(root, args.since, args.staged, pathspecs)
+        # Files changed without any added line (mode changes, removed lines
+        # only) have no hunk header in the diff
+        lines = {str(root / name): line_nbs.get(name, set()) for name in names}
+
+    return changed_targets(root, names, args.staged), lines
+
+def _archive_targets(path: pathlib.Path, args, exclude_rules=None):
+    """Yield the targets of an archive, ending with a target reporting the
+    error if it can't be read so that the other inputs are still checked"""
+
+    from moulinorme.archive import ArchiveError, archive_targets
+    from moulinorme.runner import Target
+
+    try:
+        yield from archive_targets(path, recursive=args.recursive, exclude=args.exclude, exclude_rules=exclude_rules)
+    except ArchiveError as e:
+        yield Target(path, error=f"archive can't be read: {e.__cause__ or e}")
+
+def input_targets(path: pathlib.Path, args, config=None):
+    """Yield the targets of a file, directory or archive given on the command
+    line, directories excluded by config are not explored and archive
+    members excluded by config are skipped"""
+
+    from moulinorme.walk import explore_path
+    from moulinorme.archive import is_archive
+
+    exclude_rules = None if config is None else config.exclude_rules()
+    if is_archive(path) and path.is_file():
+        return _archive_targets(path, args, exclude_rules)
+
+    return explore_path(path, recursive=args.recursive, exclude=args.exclude, gitignore=not args.no_gitignore, exclude_rules=exclude_rules)
+
+def project_config(args, cwd: pathlib.Path):
+    """Returns the Config of --config or the closest .moulinorme.toml with
+    the rules of --select and --ignore applied, None if there is none (or
+    with --no-config)
+
+    Raises ConfigError if the config file is invalid.
+    """
+
+    if args.no_config:
+        return None
+
+    from moulinorme.config import Config, find_config
 
+    if args.config is not None:
+        path = cwd / pathlib.Path(args.config).expanduser()
     else:
-        targets.append(target)
+        path = find_config(cwd.resolve())
+        if path is None:
+            return None
 
-    return targets
+    return Config.load(path).with_rules(args.select, args.ignore)
 
-def main():
-    arg_parser = ArgumentParser(description=f"Moulinorme {moulinorme.__version__}")
+def shard(value: str) -> tuple:
+    """Parse the --shard argument"""
+
+    from moulinorme.shard import parse_shard
+
+    try:
+        return parse_shard(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid shard: '{value}' (expected i/N, like 1/4)")
+
+def build_parser(parser_class=ArgumentParser) -> ArgumentParser:
+    arg_parser = parser_class(description=f"Moulinorme {moulinorme.__version__}")
     arg_parser.add_argument("-V", "--version", dest="version", action="store_true", help="Display Moulinorme version")
     arg_parser.add_argument("-v", "--verbose", dest="verbose", action="store_true", help="Increase verbosity")
     arg_parser.add_argument("-n", "--no-color", dest="no_color", action="store_true", help="Don't colorize output")
     arg_parser.add_argument("-u", "--unnecessary", dest="unnecessary", action="store_true", help="Handle unnecessary files")
     arg_parser.add_argument("-r", "--recursive", dest="recursive", action="store_true", help="Recursively list subdirectories")
     arg_parser.add_argument("-d", "--delivery", dest="delivery", action="store_true", help="Delivery check, equivalent to -ur")
-    arg_parser.add_argument(dest="files", nargs="*", default=list(), help="Files/folders to check")
-    args = arg_parser.parse_args()
+    arg_parser.add_argument("-j", "--jobs", dest="jobs", type=jobs_count, default=1, metavar="N", help="Number of files to check in parallel (0 or \"auto\" for one per CPU)")
+    arg_parser.add_argument("-s", "--select", dest="select", type=rule_list, default=list(), metavar="RULES", help="Only check these comma-separated rules (IDs or prefixes, like F3,L)")
+    arg_parser.add_argument("-i", "--ignore", dest="ignore", type=rule_list, default=list(), metavar="RULES", help="Don't check these comma-separated rules")
+    arg_parser.add_argument("-f", "--format", dest="format", choices=REPORTERS.keys(), default="text", help="Output format (default: text)")
+    arg_parser.add_argument("--encoding-errors", dest="encoding_errors", choices=ENCODING_ERRORS, default="report", help="Files that are not valid UTF-8 text are reported (default), checked with undecodable bytes replaced or skipped")
+    arg_parser.add_argument("-x", "--exclude", dest="exclude", action="append", default=list(), metavar="PATTERN", help="Skip files and folders matching this gitignore-style pattern")
+    arg_parser.add_argument("--no-gitignore", dest="no_gitignore", action="store_true", help="Don't skip files ignored by .gitignore files")
+    arg_parser.add_argument("--since", dest="since", default=None, metavar="REV", help="Only check files changed between REV and HEAD (read from git)")
+    arg_parser.add_argument("--staged", dest="staged", action="store_true", help="Only check files changed in the git index (read from the index)")
+    arg_parser.add_argument("--changed-lines", dest="changed_lines", action="store_true", help="With --since/--staged, only report violations on changed lines")
+    arg_parser.add_argument("--project", dest="project", action="store_true", help="Also check the coherence of the project as a whole (P rules)")
+    arg_parser.add_argument("--batch", dest="batch", default=None, metavar="DIR", help="Check each subdirectory (or archive) of DIR as a delivery and write a summary of each one to --batch-output, resuming where a previous run stopped")
+    arg_parser.add_argument("--batch-output", dest="batch_output", default="moulinorme-batch.jsonl", metavar="FILE", help="JSON Lines file of the --batch summaries (default: moulinorme-batch.jsonl)")
+    arg_parser.add_argument("--shard", dest="shard", type=shard, default=None, metavar="i/N", help="Only check the i-th of N shards of the files (see -f partial and 'moulinorme merge')")
+    arg_parser.add_argument("--shard-strategy", dest="shard_strategy", choices=("hash", "size"), default="hash", help="Assign files to shards by hash of their path (default) or balance their sizes")
+    arg_parser.add_argument("--baseline", dest="baseline", default=None, metavar="FILE", help="Only report violations that are not in this baseline")
+    arg_parser.add_argument("--write-baseline", dest="write_baseline", default=None, metavar="FILE", help="Save the violations found to a baseline file (for --baseline)")
+    arg_parser.add_argument("--config", dest="config", default=None, metavar="FILE", help="Read the project settings from this file (default: the closest .moulinorme.toml in the current directory or its parents)")
+    arg_parser.add_argument("--no-config", dest="no_config", action="store_true", help="Don't read the project settings from a .moulinorme.toml file")
+    arg_parser.add_argument("--no-cache", dest="no_cache", action="store_true", help="Don't use cached results of previous runs")
+    arg_parser.add_argument("--cache-dir", dest="cache_dir", type=pathlib.Path, default=None, metavar="DIR", help="Directory where results are cached")
+    arg_parser.add_argument("-w", "--watch", dest="watch", action="store_true", help="Check files again whenever they change")
+    arg_parser.add_argument("--profile", dest="profile", action="store_true", help="Print the time spent on each check, rule violation counts and the slowest files to stderr")
+    arg_parser.add_argument("--profile-output", dest="profile_output", default=None, metavar="FILE", help="Save profiling data to a JSON file (implies --profile)")
+    arg_parser.add_argument("--lsp", dest="lsp", action="store_true", help="Run a language server over stdin and stdout, publishing norm violations as diagnostics")
+    arg_parser.add_argument("--daemon", dest="daemon", action="store_true", help="Serve checks on a Unix socket (see moulinorme-client)")
+    arg_parser.add_argument("--socket", dest="socket", default=None, metavar="PATH", help="Socket path of the daemon")
+    arg_parser.add_argument(dest="files", nargs="*", default=list(), help="Files/folders to check, .tar, .tar.gz, .tgz and .zip archives are checked like folders")
+
+    return arg_parser
+
+def result_cache(args, cwd: pathlib.Path):
+    """Returns the ResultCache to use (None with --no-cache), a relative
+    --cache-dir is resolved from cwd"""
+
+    if args.no_cache:
+        return None
+
+    from moulinorme.cache import ResultCache, default_cache_dir
+
+    if args.cache_dir is None:
+        return ResultCache(default_cache_dir())
+
+    return ResultCache(cwd / args.cache_dir.expanduser())
+
+def batch(args, err, cwd: pathlib.Path) -> int:
+    """Check the submissions of args.batch (see run_batch())"""
+
+    from moulinorme.runner import CheckOptions
+    from moulinorme.batch import run_batch
+    from moulinorme.config import ConfigError
+
+    try:
+        config = project_config(args, cwd)
+    except ConfigError as e:
+        print(e, file=err)
+        return 1
+
+    cache = result_cache(args, cwd)
+    options = CheckOptions(
+        unnecessary=True,
+        cache=cache,
+        rules=RuleSet(args.select, args.ignore),
+        encoding_errors=args.encoding_errors,
+        project=args.project,
+        config=config
+    )
+
+    directory = (cwd / pathlib.Path(args.batch).expanduser()).resolve()
+    output = cwd / pathlib.Path(args.batch_output).expanduser()
+    status = run_batch(args, options, directory, output, err)
+
+    if cache is not None:
+        cache.evict()
+
+    return status
+
+def run(args, out=None, err=None, colorize=False, cwd=None) -> int:
+    """Perform the norm checks requested by parsed command line arguments
+
+    Reports are written to out and errors to err (stdout and stderr by
+    default), relative paths are resolved from cwd if it is given.
+    Returns the exit code.
+    """
+
+    out = out or sys.stdout
+    err = err or sys.stderr
 
     if args.delivery:
         args.unnecessary = True
         args.recursive = True
 
-    if sys.stdout.isatty() and sys.stderr.isatty() and not args.no_color:
-        colorize = True
-    else:
-        colorize = False
-
     if args.version:
-        print(f"Moulinorme version {moulinorme.__version__}")
+        print(f"Moulinorme version {moulinorme.__version__}", file=out)
         return 0
 
-    targets = list()
-    for filename in args.files:
-        target = pathlib.Path(filename).expanduser().resolve()
-        targets += explore_path(target, args.recursive)
+    cwd = pathlib.Path(cwd or ".")
+    if args.batch is not None:
+        return batch(args, err, cwd)
+
+    git_mode = args.since is not None or args.staged
+    if not git_mode and len(args.files) == 0:
+        print("No input files", file=err)
+        return 1
+
+    from moulinorme.runner import run_checks, CheckOptions, CheckResult
+    from moulinorme.project import ProjectIndex
+    from moulinorme.profiling import Profiler
+    from moulinorme.baseline import Baseline, BaselineError, fingerprint_messages
+    from moulinorme.config import ConfigError
 
-    if len(targets) == 0:
-        print("No input files", file=sys.stderr)
+    if args.shard is not None and args.project:
+        print("--project can't be used with --shard", file=err)
         return 1
 
+    if args.baseline is not None and args.write_baseline is not None:
+        print("--baseline and --write-baseline can't be used together", file=err)
+        return 1
+
+    try:
+        config = project_config(args, cwd)
+    except ConfigError as e:
+        print(e, file=err)
+        return 1
+
+    baseline = None
+    baseline_path = args.baseline or args.write_baseline
+    if args.write_baseline is not None:
+        baseline = Baseline()
+    elif args.baseline is not None:
+        try:
+            baseline = Baseline.load(cwd / baseline_path)
+        except BaselineError as e:
+            print(e, file=err)
+            return 1
+
+    def known_violations(messages: list, fingerprints: list) -> list:
+        """Add messages to the baseline being written, or remove the known
+        violations of the baseline from messages"""
+
+        if args.write_baseline is not None:
+            baseline.add_messages(messages, fingerprints)
+            return messages
+
+        return baseline.new_messages(messages, fingerprints)
+
+    changed = None
+    if git_mode:
+        from moulinorme.git import GitError
+
+        if args.project:
+            print("--project can't be used with --since or --staged", file=err)
+            return 1
+
+        try:
+            targets, changed = git_targets(args, cwd, config)
+        except GitError as e:
+            print(f"git: {e}", file=err)
+            return 1
+    else:
+        targets = itertools.chain.from_iterable(
+            input_targets((cwd / pathlib.Path(filename).expanduser()).resolve(), args, config)
+            for filename in args.files
+        )
+
+        first_target = next(targets, None)
+        if first_target is None:
+            print("No input files", file=err)
+            return 1
+        targets = itertools.chain([first_target], targets)
+
+    if args.shard is not None:
+        from moulinorme.shard import shard_targets
+
+        shard_index, shard_count = args.shard
+        targets = shard_targets(targets, shard_index, shard_count, cwd.resolve(), args.shard_strategy)
+
+    cache = result_cache(args, cwd)
+    reporter = REPORTERS[args.format](out, colorize=colorize, verbose=args.verbose, shard=args.shard)
+    reporter.start()
+
+    profiler = None
+    if args.profile or args.profile_output:
+        profiler = Profiler()
+
     norm_ok = True
-    for target in targets:
-        src_file = None
-        if re.match(r"^Makefile$", target.name):
-            src_file = moulinorme.Makefile(target)
-        elif re.match("^.*\.h$", target.name):
-            src_file = moulinorme.HFile(target)
-        elif re.match("^.*\.c$", target.name):
-            src_file = moulinorme.CFile(target)
-
-        if isinstance(src_file, moulinorme.SourceFile):
-            src_file.check_file()
-            src_file.print_messages(colorize=colorize)
-            if not src_file.norm_ok():
-                norm_ok = False
-        elif args.unnecessary:
-            norm_ok = False
-            o1 = moulinorme.types.NormMessage(str(target), 0, "O1, is this file required for compilation?", moulinorme.types.SeverityMajor())
-            if colorize:
-                print(o1.colorized())
+    options = CheckOptions(
+        unnecessary=args.unnecessary,
+        cache=cache,
+        profile=profiler is not None,
+        rules=RuleSet(args.select, args.ignore),
+        encoding_errors=args.encoding_errors,
+        project=args.project,
+        fingerprint_root=None if baseline is None else (cwd / baseline_path).resolve().parent,
+        config=config
+    )
+    index = ProjectIndex(options.rules) if options.project else None
+
+    for result in run_checks(targets, jobs=args.jobs, options=options):
+        if result.fingerprints is not None:
+            result.messages = known_violations(result.messages, result.fingerprints)
+        if changed is not None:
+            line_nbs = changed.get(str(result.target))
+            if line_nbs is None:
+                print(f"{result.target}: no changed lines known, reporting every violation", file=err)
             else:
-                print(str(o1))
-        elif args.verbose:
-            print(f"Skipping unhandled file: {str(target)}")
+                # File-level messages (line 0) are always kept
+                result.messages = [m for m in result.messages if m.line == 0 or m.line in line_nbs]
+
+        reporter.file_result(result)
+        if profiler is not None:
+            profiler.count_messages(result.messages)
+            if result.profile is not None:
+                profiler.merge(result.profile)
+        if not result.norm_ok():
+            norm_ok = False
+        if index is not None and result.symbols is not None:
+            index.add(result.target, result.symbols)
+
+    if index is not None:
+        for target, messages in index.check():
+            result = CheckResult(target, messages, True)
+            if baseline is not None:
+                fingerprints = fingerprint_messages(messages, target, options.fingerprint_root)
+                result.messages = known_violations(messages, fingerprints)
+
+            reporter.file_result(result)
+            if profiler is not None:
+                profiler.count_messages(result.messages)
+            if not result.norm_ok():
+                norm_ok = False
+
+    if cache is not None:
+        cache.evict()
+
+    reporter.finish(norm_ok)
 
-    if norm_ok:
-        if colorize:
-            print(f"{TermStyle.GREEN}No norm violations!{TermStyle.RESET}")
-        else:
-            print(f"No norm violations!")
+    if profiler is not None:
+        err.write(profiler.summary())
+        if args.profile_output:
+            profiler.dump(cwd / pathlib.Path(args.profile_output).expanduser())
+
+    if args.write_baseline is not None:
+        baseline.write(cwd / baseline_path)
+        print(f"Baseline of {len(baseline)} violations written to {baseline_path}", file=err)
+        return 0
 
     return 0 if norm_ok else 1
 
+def main():
+    if sys.argv[1:2] == ["merge"]:
+        from moulinorme.merge import main as merge_main
+        return merge_main(sys.argv[2:])
+
+    args = build_parser().parse_args()
+
+    if args.daemon:
+        from moulinorme.daemon import serve
+        return serve(args.socket)
+
+    if sys.stdout.isatty() and sys.stderr.isatty() and not args.no_color:
+        colorize = True
+    else:
+        colorize = False
+
+    if args.lsp:
+        from moulinorme.lsp import serve
+        return serve(args)
+
+    if args.watch:
+        from moulinorme.watch import watch
+        return watch(args, colorize=colorize)
+
+    return run(args, colorize=colorize)
+
 if __name__ == "__main__":
-    exit(main())
\ No newline at end of file
+    exit(main())
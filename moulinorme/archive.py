@@ -0,0 +1,121 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.runner import Target, source_file_class
+from moulinorme.walk import IgnoreRules, path_skipped
+import pathlib
+
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".zip")
+
+class ArchiveError(Exception):
+    pass
+
+def is_archive(path: pathlib.Path) -> bool:
+    """Returns True if path is named like an archive that can be checked"""
+
+    return path.name.lower().endswith(ARCHIVE_SUFFIXES)
+
+def member_path(archive: pathlib.Path, name: str) -> pathlib.Path:
+    """Returns the path of an archive member, as if the archive was a directory"""
+
+    return archive.joinpath(*pathlib.PurePosixPath(name).parts)
+
+def _tar_members(archive: pathlib.Path, wanted):
+    import tarfile
+
+    # Stream mode reads the archive sequentially, without seeking back
+    with tarfile.open(str(archive), mode="r|*") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+
+            read = wanted(member.name)
+            if read is None:
+                continue
+
+            if read:
+                with tar.extractfile(member) as h:
+                    yield member.name, h.read()
+            else:
+                yield member.name, None
+
+def _zip_members(archive: pathlib.Path, wanted):
+    import zipfile
+
+    with zipfile.ZipFile(str(archive)) as zip_file:
+        for info in zip_file.infolist():
+            if info.is_dir():
+                continue
+
+            read = wanted(info.filename)
+            if read is None:
+                continue
+
+            if read:
+                with zip_file.open(info) as h:
+                    yield info.filename, h.read()
+            else:
+                yield info.filename, None
+
+def archive_targets(archive: pathlib.Path, recursive=False, exclude=(), exclude_rules: IgnoreRules = None):
+    """Yield the Target objects of the files of an archive, with their
+    contents read from the archive for the files that are checked
+
+    Members are handled like the files of a directory: those in
+    subdirectories are only yielded if recursive is True, hidden ones and
+    those matching one of the exclude patterns or exclude_rules (like the
+    excluded paths of a Config) are skipped. Raises ArchiveError if the
+    archive can't be read.
+    """
+
+    # Imported here so that the CLI does not load them unless an archive
+    # is checked
+    import tarfile
+    import zipfile
+
+    root = str(archive)
+    rules = IgnoreRules() if exclude_rules is None else exclude_rules
+    rules = rules.extend(root, exclude)
+
+    def wanted(name: str):
+        """Returns None if the member is skipped, else whether its contents
+        are needed"""
+
+        relpath = str(pathlib.PurePosixPath(name))
+        if relpath.startswith("/") or relpath.startswith("../"):
+            return None
+        if not recursive and "/" in relpath:
+            return None
+        if path_skipped(rules, root, relpath):
+            return None
+
+        return source_file_class(pathlib.PurePosixPath(relpath).name) is not None
+
+    members = _zip_members if archive.name.lower().endswith(".zip") else _tar_members
+    try:
+        for name, contents in members(archive, wanted):
+            yield Target(member_path(archive, name), contents)
+    except (OSError, EOFError, tarfile.TarError, zipfile.BadZipFile) as e:
+        raise ArchiveError(f"{archive}: {e}") from e
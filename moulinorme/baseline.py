@@ -0,0 +1,174 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import collections
+import hashlib
+import pathlib
+import re
+import os
+
+BASELINE_MAGIC = b"moulinorme-baseline"
+
+# Bump when the fingerprints or the file layout change
+BASELINE_FORMAT = 2
+
+FINGERPRINT_SIZE = 8
+
+DIGITS_RE = re.compile(r"\d+")
+WHITESPACE_RE = re.compile(r"\s+")
+
+class BaselineError(Exception):
+    pass
+
+def fingerprint(rule: str, filename: str, line: str, function: str, message: str) -> bytes:
+    """Returns the fingerprint of a norm violation
+
+    line is the content of the line of the violation and message its text,
+    their whitespace and digits are normalized so that the fingerprint
+    survives the violation moving around or its counts changing.
+    """
+
+    h = hashlib.blake2b(digest_size=FINGERPRINT_SIZE)
+    h.update("\0".join((
+        rule or "",
+        filename,
+        WHITESPACE_RE.sub(" ", line.strip()),
+        function or "",
+        DIGITS_RE.sub("#", message)
+    )).encode("utf-8", "surrogatepass"))
+
+    return h.digest()
+
+def relative_name(path: pathlib.Path, root: pathlib.Path) -> str:
+    """Returns the name of path used in fingerprints: relative to root when
+    it is inside of it"""
+
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+def function_ranges(src_file) -> list:
+    """Returns the (first line, last line, name) of the functions of src_file"""
+
+    if src_file is None or not hasattr(src_file, "extract_functions"):
+        return list()
+
+    return [
+        (function["prototype_line_nb"], function["first_line_nb"] + len(function["lines"]), function["name"])
+        for function in src_file.functions
+    ]
+
+def fingerprint_messages(messages: list, path: pathlib.Path, root: pathlib.Path, src_file=None) -> list:
+    """Returns the fingerprints of messages (of the file at path), the line
+    contents and functions are taken from src_file if it is given
+
+    Paths inside root quoted by the messages (like the other definition of
+    a P1 violation) are made relative to it, so that the fingerprints do
+    not depend on where the project is checked out.
+    """
+
+    filename = relative_name(path, root)
+    root_prefix = str(root).rstrip(os.sep) + os.sep
+    lines = () if src_file is None else src_file.lines
+    functions = function_ranges(src_file) if len(messages) > 0 else list()
+
+    fingerprints = list()
+    for message in messages:
+        line = lines[message.line - 1] if 0 < message.line <= len(lines) else ""
+        function = None
+        for first, last, name in functions:
+            if first <= message.line <= last:
+                function = name
+                break
+
+        text = message.text.replace(root_prefix, "")
+        fingerprints.append(fingerprint(message.rule, filename, line, function, text))
+
+    return fingerprints
+
+class Baseline:
+    """Multiset of the fingerprints of known norm violations
+
+    A violation of the baseline is only known as many times as it was
+    found when the baseline was written, further occurrences are new.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = collections.Counter(counts or ())
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, fingerprint: bytes):
+        self.counts[fingerprint] += 1
+
+    def add_messages(self, messages: list, fingerprints: list):
+        for message, fingerprint in zip(messages, fingerprints):
+            if not message.is_ok():
+                self.add(fingerprint)
+
+    def new_messages(self, messages: list, fingerprints: list) -> list:
+        """Returns the messages that are not known violations, each known
+        violation is consumed by the first message matching it"""
+
+        counts = self.counts
+        new = list()
+        for message, fingerprint in zip(messages, fingerprints):
+            if not message.is_ok() and counts.get(fingerprint, 0) > 0:
+                counts[fingerprint] -= 1
+            else:
+                new.append(message)
+
+        return new
+
+    @classmethod
+    def load(cls, path: pathlib.Path):
+        """Load a baseline file, raises BaselineError if it can't be read"""
+
+        try:
+            data = pathlib.Path(path).read_bytes()
+        except OSError as e:
+            raise BaselineError(f"{path}: {e.strerror}")
+
+        header = BASELINE_MAGIC + bytes([BASELINE_FORMAT])
+        if not data.startswith(header) or (len(data) - len(header)) % FINGERPRINT_SIZE != 0:
+            raise BaselineError(f"{path}: not a baseline file (or of another version)")
+
+        return cls(
+            data[offset:offset + FINGERPRINT_SIZE]
+            for offset in range(len(header), len(data), FINGERPRINT_SIZE)
+        )
+
+    def write(self, path: pathlib.Path):
+        """Write the baseline atomically to a file, as the sorted fingerprints
+        following a header"""
+
+        path = pathlib.Path(path)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as h:
+            h.write(BASELINE_MAGIC + bytes([BASELINE_FORMAT]))
+            h.write(b"".join(sorted(self.counts.elements())))
+        os.replace(str(tmp_path), str(path))
@@ -0,0 +1,179 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.runner import run_checks
+from moulinorme.walk import explore_path
+from moulinorme.archive import ArchiveError, is_archive, archive_targets
+from moulinorme.project import ProjectIndex
+import collections
+import pathlib
+import json
+import os
+
+class Submission:
+    """Summary of the checks of one submission"""
+
+    def __init__(self, name: str, path: pathlib.Path, index: ProjectIndex = None):
+        self.name = name
+        self.path = path
+        self.index = index
+        self.files = 0
+        self.severities = collections.Counter()
+        self.rules = collections.Counter()
+        self.error = None
+        self.pending = 0
+        self.listed = False
+
+    def count_messages(self, messages: list):
+        for message in messages:
+            if not message.is_ok():
+                self.severities[message.severity.name] += 1
+                self.rules[message.rule or "other"] += 1
+
+    def add(self, result):
+        self.pending -= 1
+        self.files += 1
+        self.count_messages(result.messages)
+        if self.index is not None and result.symbols is not None:
+            self.index.add(result.target, result.symbols)
+
+    def done(self) -> bool:
+        return self.listed and self.pending == 0
+
+    def norm_ok(self) -> bool:
+        return self.error is None and sum(self.severities.values()) == 0
+
+    def to_dict(self) -> dict:
+        if self.index is not None:
+            for _, messages in self.index.check():
+                self.count_messages(messages)
+            self.index = None
+
+        summary = {
+            "submission": self.name,
+            "norm_ok": self.norm_ok(),
+            "files": self.files,
+            "severities": dict(sorted(self.severities.items())),
+            "rules": dict(sorted(self.rules.items()))
+        }
+        if self.error is not None:
+            summary["error"] = self.error
+
+        return summary
+
+def list_submissions(directory: pathlib.Path) -> list:
+    """Returns the paths of the submissions of directory: its subdirectories
+    and archives, sorted by name"""
+
+    with os.scandir(str(directory)) as entries:
+        paths = [
+            pathlib.Path(entry.path) for entry in entries
+            if not entry.name.startswith(".")
+            and (entry.is_dir() or (entry.is_file() and is_archive(pathlib.Path(entry.name))))
+        ]
+
+    return sorted(paths, key=lambda path: path.name)
+
+def load_checkpoint(output: pathlib.Path) -> set:
+    """Returns the names of the submissions already summarized in output
+
+    A partially written last line (from an interrupted run) is removed.
+    """
+
+    done = set()
+    size = 0
+    try:
+        with output.open("rb") as h:
+            for line in h:
+                try:
+                    done.add(json.loads(line)["submission"])
+                except (ValueError, KeyError, TypeError):
+                    break
+                size += len(line)
+    except FileNotFoundError:
+        return done
+
+    if size != output.stat().st_size:
+        os.truncate(str(output), size)
+
+    return done
+
+def run_batch(args, options, directory: pathlib.Path, output: pathlib.Path, err) -> int:
+    """Check every submission of directory as a delivery, sharing a single
+    worker pool, and append their summaries to output as JSON lines
+
+    Submissions already summarized in output are skipped, so that an
+    interrupted run resumes where it stopped.
+    """
+
+    try:
+        paths = list_submissions(directory)
+    except OSError as e:
+        print(f"{directory}: {e.strerror}", file=err)
+        return 1
+
+    done = load_checkpoint(output)
+    exclude_rules = None if options.config is None else options.config.exclude_rules()
+    submissions = collections.deque()
+    owners = collections.deque()
+
+    def targets():
+        for path in paths:
+            if path.name in done:
+                continue
+
+            submission = Submission(path.name, path, ProjectIndex(options.rules) if options.project else None)
+            submissions.append(submission)
+            if path.is_dir():
+                files = explore_path(path, recursive=True, exclude=args.exclude, gitignore=not args.no_gitignore,
+                                     exclude_rules=exclude_rules)
+            else:
+                files = archive_targets(path, recursive=True, exclude=args.exclude, exclude_rules=exclude_rules)
+
+            try:
+                for target in files:
+                    submission.pending += 1
+                    owners.append(submission)
+                    yield target
+            except ArchiveError as e:
+                submission.error = str(e)
+
+            submission.listed = True
+
+    with output.open("a") as h:
+        def flush():
+            while submissions and submissions[0].done():
+                submission = submissions.popleft()
+                h.write(f"{json.dumps(submission.to_dict())}\n")
+                h.flush()
+                if args.verbose:
+                    print(f"{submission.name}: {'OK' if submission.norm_ok() else 'KO'}", file=err)
+
+        for result in run_checks(targets(), jobs=args.jobs, options=options):
+            owners.popleft().add(result)
+            flush()
+        flush()
+
+    return 0
@@ -0,0 +1,156 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.types import NormMessage
+import moulinorme
+import hashlib
+import pathlib
+import json
+import time
+import os
+
+# Bump when the layout of cache entries changes
+CACHE_FORMAT = 3
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+# Minimum delay in seconds between two evictions, listing the cache costs
+# more than the check of a couple of files
+EVICT_INTERVAL = 300
+
+def default_cache_dir() -> pathlib.Path:
+    """Returns the cache directory to use when none is given"""
+
+    xdg_cache = os.environ.get("XDG_CACHE_HOME")
+    if xdg_cache:
+        return pathlib.Path(xdg_cache) / "moulinorme"
+
+    return pathlib.Path("~/.cache/moulinorme").expanduser()
+
+class ResultCache:
+    """On-disk cache of norm messages keyed by file contents and settings
+
+    Entries are only ever written atomically and any error accessing the
+    cache is ignored, a broken cache only means files get checked again.
+    """
+
+    def __init__(self, cache_dir: pathlib.Path, max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_size = max_size
+
+    def key(self, src_file) -> str:
+        """Returns the cache key of a SourceFile"""
+
+        h = hashlib.sha256()
+        h.update(json.dumps([
+            CACHE_FORMAT,
+            moulinorme.__version__,
+            type(src_file).__name__,
+            src_file._filename.name,
+            src_file.settings()
+        ], sort_keys=True).encode())
+
+        h.update(src_file.digest())
+
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> pathlib.Path:
+        return self.cache_dir / key[:2] / f"{key[2:]}.json"
+
+    def get(self, src_file, key: str = None):
+        """Returns the cached norm messages of src_file (with the cache key
+        key if it is already known), or None if there are none"""
+
+        entry = self._entry_path(key or self.key(src_file))
+        try:
+            with entry.open("r") as h:
+                data = json.load(h)
+        except (OSError, ValueError):
+            return None
+
+        # Mark the entry as recently used, the cache may be read-only
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+        return [NormMessage.from_dict(src_file.display_name, d) for d in data]
+
+    def put(self, src_file, messages: list, key: str = None):
+        """Store the norm messages of src_file (with the cache key key if it
+        is already known)"""
+
+        entry = self._entry_path(key or self.key(src_file))
+        tmp = entry.with_name(f"{entry.name}.{os.getpid()}.tmp")
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            with tmp.open("w") as h:
+                json.dump([message.to_dict() for message in messages], h)
+            os.replace(tmp, entry)
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_size"""
+
+        stamp = self.cache_dir / "last-evict"
+        try:
+            if time.time() - stamp.stat().st_mtime < EVICT_INTERVAL:
+                return
+        except OSError:
+            pass
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            stamp.touch()
+        except OSError:
+            return
+
+        entries = list()
+        total_size = 0
+        try:
+            for subdir in os.scandir(self.cache_dir):
+                if not subdir.is_dir():
+                    continue
+                for entry in os.scandir(subdir.path):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total_size += st.st_size
+        except OSError:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+
+            try:
+                os.unlink(path)
+                total_size -= size
+            except OSError:
+                pass
@@ -0,0 +1,94 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+# Thin client of the moulinorme daemon, this module must stay cheap to
+# import: it is all that gets loaded when the daemon is running
+
+import socket
+import json
+import sys
+import os
+
+def private_socket_directory() -> str:
+    """Returns the directory of the daemon socket when there is no runtime
+    directory: the temporary directory is shared, the socket goes in a
+    private directory created by the daemon"""
+
+    return os.path.join(os.environ.get("TMPDIR", "/tmp"), f"moulinorme-{os.getuid()}")
+
+def default_socket_path() -> str:
+    """Returns the path of the daemon socket to use when none is given"""
+
+    socket_path = os.environ.get("MOULINORME_SOCKET")
+    if socket_path:
+        return socket_path
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "moulinorme.sock")
+
+    return os.path.join(private_socket_directory(), "moulinorme.sock")
+
+def request(req: dict, socket_path: str = None) -> dict:
+    """Send a request to the daemon and return its response, raises
+    PermissionError if the socket belongs to another user"""
+
+    socket_path = socket_path or default_socket_path()
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise PermissionError(f"{socket_path} belongs to another user")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(req).encode() + b"\n")
+        with sock.makefile("rb") as h:
+            response = h.readline()
+
+    if len(response) == 0:
+        raise ConnectionError("connection closed by the daemon")
+
+    return json.loads(response)
+
+def main():
+    """Forward the command line arguments to the daemon, or check the
+    files in this process if no daemon is running"""
+
+    req = {
+        "argv": sys.argv[1:],
+        "cwd": os.getcwd(),
+        "colorize": sys.stdout.isatty() and sys.stderr.isatty()
+    }
+
+    try:
+        response = request(req)
+    except OSError:
+        from moulinorme.__main__ import main as local_main
+        return local_main()
+
+    sys.stdout.write(response.get("output", ""))
+    sys.stderr.write(response.get("error", ""))
+    return response.get("status", 1)
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,250 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.rules import RuleSet, parse_rule_list
+from moulinorme.walk import IgnoreRules, translate_glob
+import pathlib
+import re
+
+CONFIG_NAME = ".moulinorme.toml"
+
+# Settings of the norm checks that can be configured, each one overrides
+# the SourceFile attribute of the same name prefixed with '_'
+SETTINGS = ("tabsize", "indent_size", "max_columns", "max_funcs", "max_func_lines", "max_func_args")
+
+class ConfigError(Exception):
+    pass
+
+def load_toml(path: pathlib.Path) -> dict:
+    """Parse a TOML file with tomllib (Python 3.11+) or the tomli package"""
+
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ConfigError(f"{path}: reading it requires Python 3.11+ or the tomli package")
+
+    try:
+        with open(str(path), "rb") as h:
+            return tomllib.load(h)
+    except OSError as e:
+        raise ConfigError(f"{path}: {e.strerror}")
+    except tomllib.TOMLDecodeError as e:
+        raise ConfigError(f"{path}: {e}")
+
+def find_config(directory: pathlib.Path):
+    """Returns the path of the closest config file in directory or its
+    parents, or None"""
+
+    for parent in (directory, *directory.parents):
+        path = parent / CONFIG_NAME
+        if path.is_file():
+            return path
+
+    return None
+
+def compile_globs(patterns: list):
+    """Compile gitignore-style globs into a single pattern matching the
+    paths (relative to the config file) they select
+
+    Globs without a slash match a name at any depth, a glob matching a
+    directory also matches everything inside of it.
+    """
+
+    alternatives = list()
+    for pattern in patterns:
+        pattern = pattern.rstrip("/")
+        if "/" in pattern:
+            alternatives.append(translate_glob(pattern.lstrip("/")))
+        else:
+            alternatives.append(f"(?:.*/)?{translate_glob(pattern)}")
+
+    return re.compile(f"(?:{'|'.join(alternatives)})(?:/.*)?\\Z")
+
+def _check_keys(table: dict, keys: tuple, path: pathlib.Path):
+    for key in table:
+        if key not in keys and key not in SETTINGS:
+            raise ConfigError(f"{path}: unknown setting '{key}'")
+
+def _string_list(table: dict, key: str, path: pathlib.Path) -> list:
+    value = table.get(key, list())
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ConfigError(f"{path}: '{key}' must be a list of strings")
+
+    return value
+
+def _settings(table: dict, path: pathlib.Path) -> dict:
+    settings = dict()
+    for name, value in table.items():
+        if name in SETTINGS:
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                raise ConfigError(f"{path}: '{name}' must be a positive integer")
+            settings[name] = value
+
+    return settings
+
+def _rule_list(table: dict, key: str, path: pathlib.Path) -> list:
+    try:
+        return parse_rule_list(",".join(_string_list(table, key, path)))
+    except ValueError as e:
+        raise ConfigError(f"{path}: {e}")
+
+class Override:
+    """Settings and rules of the files matching some globs"""
+
+    __slots__ = ("regex", "settings", "select", "ignore")
+
+    def __init__(self, regex, settings: dict, select: list, ignore: list):
+        self.regex = regex
+        self.settings = settings
+        self.select = select
+        self.ignore = ignore
+
+class Config:
+    """Settings, enabled rules and excluded paths of a project
+
+    Paths are relative to root, the directory of the config file. Overrides
+    apply in order to the files matching their globs, the later ones win.
+    """
+
+    def __init__(self, root: pathlib.Path, exclude=(), settings: dict = None, select=(), ignore=(), overrides=(),
+                 forced_select=()):
+        self.root = root
+        self.exclude = list(exclude)
+        self.settings = dict(settings or ())
+        self.select = list(select)
+        self.ignore = list(ignore)
+        self.overrides = list(overrides)
+        # Rules selected on the command line, they take precedence over the
+        # selections of the config and of its overrides
+        self.forced_select = list(forced_select)
+        self._rule_sets = dict()
+
+    @classmethod
+    def load(cls, path: pathlib.Path):
+        """Load a config file, raises ConfigError if it is invalid
+
+        exclude = ["vendor/", "tests/"]
+        max_columns = 100
+        ignore = ["L3"]
+
+        [[overrides]]
+        paths = ["lib/**"]
+        max_func_lines = 40
+        ignore = ["F4"]
+        """
+
+        path = pathlib.Path(path).resolve()
+        data = load_toml(path)
+        _check_keys(data, ("exclude", "select", "ignore", "overrides"), path)
+
+        overrides = list()
+        tables = data.get("overrides", list())
+        if not isinstance(tables, list) or not all(isinstance(table, dict) for table in tables):
+            raise ConfigError(f"{path}: 'overrides' must be an array of tables")
+        for table in tables:
+            _check_keys(table, ("paths", "select", "ignore"), path)
+            patterns = _string_list(table, "paths", path)
+            if len(patterns) == 0:
+                raise ConfigError(f"{path}: an override has no 'paths'")
+            overrides.append(Override(
+                compile_globs(patterns),
+                _settings(table, path),
+                _rule_list(table, "select", path),
+                _rule_list(table, "ignore", path)
+            ))
+
+        return cls(
+            path.parent,
+            exclude=_string_list(data, "exclude", path),
+            settings=_settings(data, path),
+            select=_rule_list(data, "select", path),
+            ignore=_rule_list(data, "ignore", path),
+            overrides=overrides
+        )
+
+    def with_rules(self, select=(), ignore=()):
+        """Returns the config with rules selected and ignored on the command
+        line: a selection replaces the ones of the config and of its
+        overrides, ignored rules are added to its own"""
+
+        return Config(
+            self.root,
+            self.exclude,
+            self.settings,
+            self.select,
+            self.ignore + list(ignore),
+            self.overrides,
+            forced_select=list(select) if len(select) > 0 else self.forced_select
+        )
+
+    def exclude_rules(self) -> IgnoreRules:
+        """Returns the excluded paths as ignore rules"""
+
+        return IgnoreRules().extend(str(self.root), self.exclude)
+
+    def rules(self) -> RuleSet:
+        """Returns the rules enabled outside of the overrides"""
+
+        select = self.forced_select if len(self.forced_select) > 0 else self.select
+        return self._rule_set(tuple(select), tuple(self.ignore))
+
+    def _rule_set(self, select: tuple, ignore: tuple) -> RuleSet:
+        rule_set = self._rule_sets.get((select, ignore))
+        if rule_set is None:
+            rule_set = RuleSet(select, ignore)
+            self._rule_sets[(select, ignore)] = rule_set
+
+        return rule_set
+
+    def file_options(self, path: pathlib.Path):
+        """Returns the (settings, RuleSet) of a file"""
+
+        settings = self.settings
+        select = self.select
+        ignore = self.ignore
+
+        try:
+            relpath = path.relative_to(self.root).as_posix()
+        except ValueError:
+            relpath = None
+
+        if relpath is not None:
+            for override in self.overrides:
+                if override.regex.match(relpath):
+                    if len(override.settings) > 0:
+                        settings = dict(settings, **override.settings)
+                    if len(override.select) > 0:
+                        select = override.select
+                    ignore = ignore + override.ignore
+
+        if len(self.forced_select) > 0:
+            select = self.forced_select
+
+        return settings, self._rule_set(tuple(select), tuple(ignore))
@@ -0,0 +1,224 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.__main__ import build_parser, run
+from moulinorme.runner import check_target, CheckOptions
+from moulinorme.rules import RuleSet, parse_rule_list
+from moulinorme.config import Config, ConfigError, find_config
+from moulinorme.client import default_socket_path, private_socket_directory
+from moulinorme.types import format_messages
+from argparse import ArgumentParser
+import socketserver
+import pathlib
+import socket
+import json
+import stat
+import sys
+import io
+import os
+
+class ParserExit(Exception):
+    def __init__(self, status: int):
+        super().__init__(status)
+        self.status = status
+
+class RequestArgumentParser(ArgumentParser):
+    """ArgumentParser writing to a buffer and raising ParserExit instead of
+    exiting the daemon"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buffer = io.StringIO()
+
+    def _print_message(self, message, file=None):
+        if message:
+            self.buffer.write(message)
+
+    def exit(self, status=0, message=None):
+        if message:
+            self.buffer.write(message)
+        raise ParserExit(status)
+
+def check_argv(req: dict) -> dict:
+    """Handle a request holding command line arguments"""
+
+    parser = build_parser(RequestArgumentParser)
+    parser.prog = "moulinorme"
+    try:
+        args = parser.parse_args(req.get("argv", list()))
+    except ParserExit as e:
+        if e.status == 0:
+            return {"status": 0, "output": parser.buffer.getvalue()}
+        return {"status": e.status, "error": parser.buffer.getvalue()}
+
+    if args.daemon:
+        return {"status": 1, "error": "The daemon is already running\n"}
+    if args.watch:
+        return {"status": 1, "error": "Watch mode is not available through the daemon\n"}
+    if args.lsp:
+        return {"status": 1, "error": "The language server is not available through the daemon\n"}
+
+    out = io.StringIO()
+    err = io.StringIO()
+    colorize = req.get("colorize", False) and not args.no_color
+    status = run(args, out=out, err=err, colorize=colorize, cwd=req.get("cwd"))
+
+    return {"status": status, "output": out.getvalue(), "error": err.getvalue()}
+
+def check_buffers(req: dict) -> dict:
+    """Handle a request holding a batch of files, with their contents when
+    they are not checked from the disk
+
+    The settings of the closest config file of cwd apply unless no_config is
+    set in the request.
+    """
+
+    cwd = pathlib.Path(req.get("cwd") or ".")
+    select = parse_rule_list(req.get("select", ""))
+    ignore = parse_rule_list(req.get("ignore", ""))
+
+    config = None
+    if not req.get("no_config", False):
+        path = find_config(cwd.resolve())
+        if path is not None:
+            try:
+                config = Config.load(path).with_rules(select, ignore)
+            except ConfigError as e:
+                return {"status": 1, "error": f"{e}\n"}
+
+    options = CheckOptions(
+        unnecessary=req.get("unnecessary", False),
+        rules=RuleSet(select, ignore),
+        encoding_errors=req.get("encoding_errors", "report"),
+        config=config
+    )
+    output = list()
+    messages = list()
+    norm_ok = True
+
+    for buffer in req["buffers"]:
+        target = (cwd / pathlib.Path(buffer["name"]).expanduser()).resolve()
+        result = check_target(target, options, buffer.get("content"))
+        if not result.norm_ok():
+            norm_ok = False
+
+        output.append(format_messages(result.messages, colorize=req.get("colorize", False)))
+        for message in result.messages:
+            d = message.to_dict()
+            d["filename"] = message.filename
+            messages.append(d)
+
+    return {"status": 0 if norm_ok else 1, "output": "".join(output), "messages": messages}
+
+def handle_request(req: dict) -> dict:
+    if "buffers" in req:
+        return check_buffers(req)
+
+    return check_argv(req)
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Answer each JSON request line with a JSON response line"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = handle_request(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                response = {"status": 2, "error": f"Invalid request: {e}\n"}
+            except Exception as e:
+                response = {"status": 2, "error": f"{type(e).__name__}: {e}\n"}
+
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def daemon_running(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+
+    return True
+
+def private_directory(directory: str):
+    """Create directory readable by the current user only, raises
+    PermissionError if it exists and is not"""
+
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{directory} is not a private directory")
+
+def serve(socket_path: str = None) -> int:
+    """Serve norm checks on a Unix socket until interrupted"""
+
+    socket_path = socket_path or default_socket_path()
+    if os.path.dirname(socket_path) == private_socket_directory():
+        try:
+            private_directory(private_socket_directory())
+        except OSError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+    try:
+        st = os.lstat(socket_path)
+    except FileNotFoundError:
+        st = None
+
+    if st is not None:
+        if not stat.S_ISSOCK(st.st_mode):
+            print(f"{socket_path} exists and is not a socket", file=sys.stderr)
+            return 1
+        if daemon_running(socket_path):
+            print(f"A daemon is already listening on {socket_path}", file=sys.stderr)
+            return 1
+        # Stale socket of a daemon that did not exit cleanly
+        os.unlink(socket_path)
+
+    # Create the socket with restricted permissions instead of changing them
+    # after binding it
+    umask = os.umask(0o177)
+    try:
+        server = DaemonServer(socket_path, RequestHandler)
+    finally:
+        os.umask(umask)
+    print(f"Listening on {socket_path}", file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+    return 0
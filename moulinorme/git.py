@@ -0,0 +1,187 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.runner import Target, source_file_class
+import subprocess
+import codecs
+import threading
+import pathlib
+import re
+
+HUNK_RE = re.compile(rb"^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+class GitError(Exception):
+    pass
+
+def git(args: list, cwd: pathlib.Path) -> bytes:
+    """Run a git command and return its output"""
+
+    try:
+        proc = subprocess.run(
+            ["git", "-c", "core.quotepath=off"] + args,
+            cwd=str(cwd),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+    except OSError as e:
+        raise GitError(f"cannot run git: {e}")
+
+    if proc.returncode != 0:
+        raise GitError(proc.stderr.decode(errors="replace").strip())
+
+    return proc.stdout
+
+def repository_root(cwd: pathlib.Path) -> pathlib.Path:
+    return pathlib.Path(git(["rev-parse", "--show-toplevel"], cwd).decode().strip())
+
+def diff_args(since: str = None, staged: bool = False) -> list:
+    """Returns the git diff arguments comparing the index (if staged) or HEAD
+    to since (or HEAD)"""
+
+    if staged:
+        return ["--cached", since or "HEAD"]
+
+    return [since or "HEAD", "HEAD"]
+
+def object_prefix(staged: bool = False) -> str:
+    """Returns the prefix of the object names of the changed files contents"""
+
+    return ":" if staged else "HEAD:"
+
+def changed_files(root: pathlib.Path, since: str = None, staged: bool = False, pathspecs=()) -> list:
+    """Returns the paths (relative to root) of the files added or modified
+    since a revision (or in the index)"""
+
+    output = git(
+        ["diff", "--name-only", "-z", "--no-renames", "--diff-filter=ACMT"]
+        + diff_args(since, staged) + ["--"] + list(pathspecs),
+        root
+    )
+
+    return [name.decode() for name in output.split(b"\0") if len(name) > 0]
+
+def changed_lines(root: pathlib.Path, since: str = None, staged: bool = False, pathspecs=()) -> dict:
+    """Returns the line numbers of the added or modified lines of each changed
+    file, as a dictionary of paths (relative to root) to sets of line numbers"""
+
+    # Force the prefixes so that diff.noprefix and diff.mnemonicPrefix cannot
+    # change the format of the file headers
+    output = git(
+        ["diff", "-U0", "--no-color", "--no-ext-diff", "--no-renames", "--diff-filter=ACMT",
+         "--src-prefix=a/", "--dst-prefix=b/"]
+        + diff_args(since, staged) + ["--"] + list(pathspecs),
+        root
+    )
+
+    lines = dict()
+    current = None
+    # Lines left in the current hunk, added lines may start with "+++ "
+    # (or removed ones with "--- ") too
+    remaining = 0
+    for line in output.split(b"\n"):
+        if remaining > 0:
+            # "\ No newline at end of file" markers are not counted
+            if not line.startswith(b"\\"):
+                remaining -= 1
+        elif line.startswith(b"+++ "):
+            name = line[4:]
+            if name.startswith(b'"'):
+                name = codecs.escape_decode(name[1:-1])[0]
+            if not name.startswith(b"b/"):
+                raise GitError(f"unexpected diff header: {line.decode(errors='replace')}")
+            current = lines.setdefault(name[2:].decode(), set())
+        elif current is not None:
+            match = HUNK_RE.match(line)
+            if match:
+                old_count = 1 if match.group(1) is None else int(match.group(1))
+                start = int(match.group(2))
+                count = 1 if match.group(3) is None else int(match.group(3))
+                current.update(range(start, start + count))
+                remaining = old_count + count
+
+    return lines
+
+def read_blobs(root: pathlib.Path, object_names: list):
+    """Read objects through a single git cat-file --batch process and yield
+    (object name, contents) tuples, contents is None for missing objects"""
+
+    proc = subprocess.Popen(
+        ["git", "cat-file", "--batch"],
+        cwd=str(root),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE
+    )
+
+    # Feed the object names from another thread so that neither pipe can
+    # fill up while the other side is blocked
+    def feed():
+        try:
+            for name in object_names:
+                proc.stdin.write(f"{name}\n".encode())
+        except BrokenPipeError:
+            pass
+        finally:
+            proc.stdin.close()
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+
+    try:
+        for name in object_names:
+            header = proc.stdout.readline()
+            if len(header) == 0:
+                raise GitError("git cat-file exited unexpectedly")
+
+            if header.endswith(b" missing\n") or header.endswith(b" ambiguous\n"):
+                yield name, None
+                continue
+
+            _, object_type, size = header.split()
+            contents = proc.stdout.read(int(size))
+            proc.stdout.read(1)
+            yield name, contents if object_type == b"blob" else None
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        feeder.join()
+
+def changed_targets(root: pathlib.Path, names: list, staged: bool = False):
+    """Yield the Target objects of changed files (names relative to root),
+    with their contents read from git for the files that are checked"""
+
+    handled = [name for name in names if source_file_class(pathlib.PurePosixPath(name).name) is not None]
+    prefix = object_prefix(staged)
+    blobs = read_blobs(root, [f"{prefix}{name}" for name in handled])
+    handled = set(handled)
+
+    for name in names:
+        path = root / name
+        if name in handled:
+            _, contents = next(blobs)
+            if contents is None:
+                continue
+            yield Target(path, contents)
+        else:
+            yield Target(path)
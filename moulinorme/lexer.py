@@ -0,0 +1,248 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import re
+
+FUNCTION_RE = re.compile(r"^([a-zA-Z0-9_\*]*) ([a-zA-Z0-9_\*]*)\((.*)\)$")
+FUNCTION_MULTILINE_RE = re.compile(r"^([a-zA-Z0-9_\*]*) ([a-zA-Z0-9_\*]*)\((.*),$")
+
+COMMENT_MARKERS = ("//", "/*", "*/")
+KEYWORDS = ("if", "for", "while", "return", "switch", "do")
+KEYWORD_TRAILS = tuple(f"{keyword}{trail}" for keyword in KEYWORDS for trail in ("(", "{"))
+
+# No keyword is a suffix of another and none of them contain a trailing
+# character, so matches of this pattern can never overlap
+KEYWORD_RE = re.compile(f"(?:{'|'.join(KEYWORDS)})[({{]")
+
+# Top-level declarations, see index_symbols()
+PROTOTYPE_RE = re.compile(r"^(?!return |else )(?:[a-zA-Z_][a-zA-Z0-9_]* )+\**([a-zA-Z_][a-zA-Z0-9_]*)\(.*\);$")
+MACRO_RE = re.compile(r"^\s*#\s*define\s+([a-zA-Z_][a-zA-Z0-9_]*)")
+TYPE_RE = re.compile(r"^(?:(?:typedef )?(?:struct|union|enum) ([a-zA-Z_][a-zA-Z0-9_]*)|typedef .*[ *]([a-zA-Z_][a-zA-Z0-9_]*);$|}\s*([a-zA-Z_][a-zA-Z0-9_]*);$)")
+EXTERN_RE = re.compile(r"^extern .*[ *]([a-zA-Z_][a-zA-Z0-9_]*)(?:\[.*\])?;$")
+LOCAL_INCLUDE_RE = re.compile(r'^\s*#\s*include\s*"([^"]+)"')
+IDENTIFIER_RE = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
+
+# index_functions() states
+_OUTSIDE = 0
+_PROTOTYPE = 1
+_OPENING = 2
+_BODY = 3
+
+class LineTokens:
+    """Tokens of a function body line that are relevant to the norm checks
+
+    comments: columns of the comment markers that are not surrounded by double quotes
+    keywords: (keyword, column) of the keywords directly followed by '(' or '{'
+    """
+
+    __slots__ = ("comments", "keywords")
+
+    def __init__(self, comments: list, keywords: list):
+        self.comments = comments
+        self.keywords = keywords
+
+def tokenize_line(line: str) -> LineTokens:
+    """Tokenize a single (stripped) function body line"""
+
+    first_dquote = line.find('"')
+    last_dquote = line.rfind('"')
+
+    comments = list()
+    for marker in COMMENT_MARKERS:
+        pos = line.find(marker)
+        if pos != -1 and not (first_dquote != -1 and first_dquote < pos < last_dquote):
+            comments.append(pos)
+
+    keywords = list()
+    if "(" in line or "{" in line:
+        found = dict()
+        for match in KEYWORD_RE.finditer(line):
+            found.setdefault(match.group(), match.start())
+
+        if len(found) > 0:
+            for keyword_trail in KEYWORD_TRAILS:
+                if keyword_trail in found:
+                    keywords.append((keyword_trail[:-1], found[keyword_trail]))
+
+    return LineTokens(comments, keywords)
+
+def prototype_name(prototype: str) -> str:
+    """Extract function name from its prototype"""
+
+    start = prototype.find(" ") + 1
+    end = prototype.find("(", start)
+
+    return prototype[start:end].replace("*", "").strip()
+
+def prototype_args(prototype: str):
+    """Extract function arguments from its prototype"""
+
+    start = prototype.find("(") + 1
+    end = prototype.find(")", start)
+    argw = prototype[start:end].strip()
+
+    if len(argw) == 0:
+        return None
+
+    if argw == "void":
+        return list()
+
+    return [arg.strip() for arg in argw.split(",")]
+
+def _new_function(prototype: str, line_nb: int) -> dict:
+    return {
+        "prototype": prototype,
+        "prototype_line_nb": line_nb,
+        "first_line_nb": line_nb + 1,
+        "lines": [],
+        "tokens": []
+    }
+
+def index_functions(lines, tokenize=True) -> list:
+    """Find the function definitions in a single pass over lines
+
+    A definition starts with a prototype at the beginning of a line (which
+    spans multiple lines when it ends with a ','). Its body starts after
+    the opening brace line and ends on the next line starting with a closing
+    brace. Each function is a dictionary holding its prototype, name, args,
+    body lines and their LineTokens (None unless tokenize is True).
+
+    A function left unterminated at the end of the file is kept with the
+    body lines found so far.
+    """
+
+    functions = list()
+    function = None
+    state = _OUTSIDE
+
+    line_nb = 0
+    for line in lines:
+        line_nb += 1
+
+        if state == _OUTSIDE:
+            if FUNCTION_RE.match(line):
+                function = _new_function(line, line_nb)
+                function["first_line_nb"] = line_nb + 2
+                state = _OPENING
+            elif FUNCTION_MULTILINE_RE.match(line):
+                function = _new_function(line, line_nb)
+                state = _PROTOTYPE
+
+        elif state == _PROTOTYPE:
+            if line.startswith("{"):
+                function["first_line_nb"] = line_nb + 1
+                state = _BODY
+            else:
+                function["prototype"] += f" {line.strip()}"
+
+        elif state == _OPENING:
+            state = _BODY
+
+        elif line.startswith("}"):
+            functions.append(function)
+            state = _OUTSIDE
+
+        else:
+            function["lines"].append(line)
+            if tokenize:
+                function["tokens"].append(tokenize_line(line.strip()))
+
+    if state != _OUTSIDE:
+        functions.append(function)
+
+    for function in functions:
+        if not tokenize:
+            function["tokens"] = None
+        function["name"] = prototype_name(function["prototype"])
+        function["args"] = prototype_args(function["prototype"])
+
+    return functions
+
+def index_symbols(lines, functions: list) -> dict:
+    """Index the symbols of a file in a single pass over lines
+
+    functions are the definitions found by index_functions(). Returns a
+    dictionary holding:
+    definitions: (name, line number) of the function definitions
+    prototypes: (name, line number) of the top-level function prototypes
+    declarations: names of the functions, prototypes, macros, types and
+        extern variables the file declares
+    includes: (header, line number) of the local ("") include directives
+    references: identifiers used in the file, leaving out the name declared
+        by each line and the include directives
+    """
+
+    definitions = list()
+    declarations = set()
+    declared_at = dict()
+    body_lines = set()
+    for function in functions:
+        declarations.add(function["name"])
+        definitions.append((function["name"], function["prototype_line_nb"]))
+        declared_at[function["prototype_line_nb"]] = function["name"]
+        body_lines.update(range(function["first_line_nb"], function["first_line_nb"] + len(function["lines"])))
+
+    prototypes = list()
+    includes = list()
+    references = set()
+
+    line_nb = 0
+    for line in lines:
+        line_nb += 1
+
+        match = LOCAL_INCLUDE_RE.match(line)
+        if match:
+            includes.append((match.group(1), line_nb))
+            continue
+
+        identifiers = IDENTIFIER_RE.findall(line)
+        if len(identifiers) == 0:
+            continue
+
+        name = declared_at.get(line_nb)
+        if name is None and line_nb not in body_lines:
+            match = PROTOTYPE_RE.match(line)
+            if match:
+                name = match.group(1)
+                prototypes.append((name, line_nb))
+            else:
+                match = MACRO_RE.match(line) or TYPE_RE.match(line) or EXTERN_RE.match(line)
+                if match:
+                    name = next(group for group in match.groups() if group is not None)
+
+            if name is not None:
+                declarations.add(name)
+
+        if name in identifiers:
+            identifiers.remove(name)
+        references.update(identifiers)
+
+    return {
+        "definitions": definitions,
+        "prototypes": prototypes,
+        "declarations": declarations,
+        "includes": includes,
+        "references": references
+    }
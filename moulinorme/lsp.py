@@ -0,0 +1,301 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.runner import source_file_class
+from moulinorme.source import HFile, CFile
+from moulinorme.rules import RuleSet
+from moulinorme.types import SeverityMajor, SeverityMinor, SeverityInfo
+import moulinorme
+import urllib.parse
+import pathlib
+import json
+import sys
+import re
+
+# LSP DiagnosticSeverity of the norm violations
+DIAGNOSTIC_SEVERITIES = {
+    SeverityMajor.name: 1,
+    SeverityMinor.name: 2,
+    SeverityInfo.name: 3
+}
+
+# TextDocumentSyncKind.Incremental
+SYNC_INCREMENTAL = 2
+
+METHOD_NOT_FOUND = -32601
+
+LINE_RE = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$")
+
+def uri_path(uri: str) -> pathlib.Path:
+    """Returns the path of a file:// URI"""
+
+    return pathlib.Path(urllib.parse.unquote(urllib.parse.urlparse(uri).path))
+
+def utf16_index(line: str, character: int) -> int:
+    """Returns the index in line of a position in UTF-16 code units"""
+
+    units = 0
+    for index, c in enumerate(line):
+        if units >= character:
+            return index
+        units += 2 if ord(c) > 0xffff else 1
+
+    return len(line)
+
+def utf16_length(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+def split_lines(text: str) -> list:
+    """Split text into lines with their line endings, only '\\n', '\\r\\n' and
+    '\\r' end lines (unlike str.splitlines())"""
+
+    return LINE_RE.findall(text)
+
+class Document:
+    """Text of an open document, kept as a list of lines (with their line
+    endings) so that incremental edits only touch the edited lines, and the
+    results of its last check"""
+
+    def __init__(self, uri: str, text: str):
+        self.uri = uri
+        self.path = uri_path(uri)
+        self.lines = split_lines(text)
+        self.checked_functions = None
+        self.checked_lines = None
+
+    def text(self) -> str:
+        return "".join(self.lines)
+
+    def position(self, position: dict):
+        """Returns the (line index, index in the line) of an LSP position"""
+
+        line_nb = position["line"]
+        if line_nb >= len(self.lines):
+            return len(self.lines), 0
+
+        # Characters past the end of the line mean the end of the line, not
+        # its line ending
+        return line_nb, utf16_index(self.lines[line_nb].rstrip("\r\n"), position["character"])
+
+    def apply_change(self, change: dict):
+        """Apply a TextDocumentContentChangeEvent"""
+
+        if "range" not in change:
+            self.lines = split_lines(change["text"])
+            return
+
+        start_line, start = self.position(change["range"]["start"])
+        end_line, end = self.position(change["range"]["end"])
+
+        prefix = self.lines[start_line][:start] if start_line < len(self.lines) else ""
+        suffix = self.lines[end_line][end:] if end_line < len(self.lines) else ""
+        edited = f"{prefix}{change['text']}{suffix}"
+
+        # An edit that removes the end of a line joins it with the next one
+        if end_line + 1 < len(self.lines):
+            following = self.lines[end_line + 1]
+            if not edited.endswith(("\n", "\r")) or (edited.endswith("\r") and following.startswith("\n")):
+                end_line += 1
+                edited += following
+
+        self.lines[start_line:end_line + 1] = split_lines(edited)
+
+    def check(self, rules: RuleSet, settings: dict = None) -> list:
+        """Check the document, only the lines and functions that changed
+        since the previous check are checked again"""
+
+        cls = source_file_class(self.path.name)
+        if cls is None:
+            return list()
+
+        src_file = cls(self.path, self.text(), rules=rules, settings=settings)
+        if cls is CFile:
+            src_file.check_file(self.checked_functions, self.checked_lines or dict())
+            self.checked_functions = getattr(src_file, "checked_functions", None)
+        elif cls is HFile:
+            src_file.check_file(self.checked_lines or dict())
+        else:
+            src_file.check_file()
+        self.checked_lines = getattr(src_file, "checked_lines", None)
+
+        return src_file.messages
+
+    def diagnostic(self, message) -> dict:
+        line_nb = max(message.line - 1, 0)
+        line = self.lines[line_nb].rstrip("\r\n") if line_nb < len(self.lines) else ""
+        start = 0 if message.column == 0 else utf16_length(line[:message.column - 1])
+
+        diagnostic = {
+            "range": {
+                "start": {"line": line_nb, "character": start},
+                "end": {"line": line_nb, "character": max(start, utf16_length(line))}
+            },
+            "severity": DIAGNOSTIC_SEVERITIES[message.severity.name],
+            "source": "moulinorme",
+            "message": message.text
+        }
+        if message.rule is not None:
+            diagnostic["code"] = message.rule
+
+        return diagnostic
+
+class LanguageServer:
+    """Publish norm violations of the open documents as LSP diagnostics"""
+
+    def __init__(self, rules: RuleSet = None, stdin=None, stdout=None, config=None):
+        self.rules = rules or RuleSet()
+        if config is not None:
+            self.rules = config.rules()
+        self.config = config
+        self.stdin = stdin or sys.stdin.buffer
+        self.stdout = stdout or sys.stdout.buffer
+        self.documents = dict()
+        self.shutdown = False
+
+    def read_message(self):
+        """Returns the next JSON-RPC message, or None at the end of the input"""
+
+        length = None
+        while True:
+            header = self.stdin.readline()
+            if len(header) == 0:
+                return None
+
+            header = header.strip()
+            if len(header) == 0:
+                break
+
+            name, _, value = header.decode("ascii").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+
+        if length is None:
+            return None
+
+        return json.loads(self.stdin.read(length))
+
+    def send(self, message: dict):
+        message["jsonrpc"] = "2.0"
+        body = json.dumps(message).encode()
+        self.stdout.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+        self.stdout.flush()
+
+    def publish(self, document: Document):
+        settings = None
+        rules = self.rules
+        if self.config is not None:
+            settings, rules = self.config.file_options(document.path)
+
+        diagnostics = [
+            document.diagnostic(message)
+            for message in sorted(document.check(rules, settings), key=lambda x: x.line)
+            if not message.is_ok()
+        ]
+        self.send({
+            "method": "textDocument/publishDiagnostics",
+            "params": {"uri": document.uri, "diagnostics": diagnostics}
+        })
+
+    def initialize(self, params: dict) -> dict:
+        return {
+            "capabilities": {
+                "textDocumentSync": {"openClose": True, "change": SYNC_INCREMENTAL}
+            },
+            "serverInfo": {"name": "moulinorme", "version": moulinorme.__version__}
+        }
+
+    def did_open(self, params: dict):
+        item = params["textDocument"]
+        document = Document(item["uri"], item["text"])
+        self.documents[document.uri] = document
+        self.publish(document)
+
+    def did_change(self, params: dict):
+        document = self.documents.get(params["textDocument"]["uri"])
+        if document is None:
+            return
+
+        for change in params["contentChanges"]:
+            document.apply_change(change)
+        self.publish(document)
+
+    def did_close(self, params: dict):
+        uri = params["textDocument"]["uri"]
+        if self.documents.pop(uri, None) is not None:
+            self.send({
+                "method": "textDocument/publishDiagnostics",
+                "params": {"uri": uri, "diagnostics": []}
+            })
+
+    def handle(self, message: dict):
+        """Handle a request or a notification"""
+
+        method = message.get("method")
+        params = message.get("params") or dict()
+
+        if method == "initialize":
+            result = self.initialize(params)
+        elif method == "shutdown":
+            self.shutdown = True
+            result = None
+        elif method == "textDocument/didOpen":
+            return self.did_open(params)
+        elif method == "textDocument/didChange":
+            return self.did_change(params)
+        elif method == "textDocument/didClose":
+            return self.did_close(params)
+        elif "id" in message and method is not None:
+            self.send({"id": message["id"], "error": {"code": METHOD_NOT_FOUND, "message": f"Unhandled method {method}"}})
+            return
+        else:
+            return
+
+        if "id" in message:
+            self.send({"id": message["id"], "result": result})
+
+    def run(self) -> int:
+        while True:
+            message = self.read_message()
+            if message is None:
+                return 1
+
+            if message.get("method") == "exit":
+                return 0 if self.shutdown else 1
+
+            self.handle(message)
+
+def serve(args) -> int:
+    """Run a language server over stdin and stdout"""
+
+    from moulinorme.__main__ import project_config
+    from moulinorme.config import ConfigError
+
+    try:
+        config = project_config(args, pathlib.Path("."))
+    except ConfigError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    return LanguageServer(RuleSet(args.select, args.ignore), config=config).run()
@@ -0,0 +1,145 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.types import NormMessage
+from moulinorme.runner import CheckResult
+from moulinorme.report import REPORTERS, PARTIAL_FORMAT
+from argparse import ArgumentParser
+import moulinorme
+import pathlib
+import json
+import sys
+
+class MergeError(Exception):
+    pass
+
+class PartialReport:
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.shard = None
+        self.norm_ok = None
+        self.files = list()
+
+    @classmethod
+    def read(cls, path: pathlib.Path):
+        """Read a partial report, raises MergeError if it is not a complete one"""
+
+        report = cls(path)
+        try:
+            with open(str(path), "r") as h:
+                header = json.loads(h.readline() or "null")
+                if not isinstance(header, dict) or header.get("partial") != PARTIAL_FORMAT:
+                    raise MergeError(f"{path}: not a partial report (or of another version)")
+
+                shard = header.get("shard")
+                report.shard = None if shard is None else tuple(shard)
+
+                for line in h:
+                    data = json.loads(line)
+                    if "norm_ok" in data:
+                        report.norm_ok = data["norm_ok"]
+                        break
+
+                    filename = data["file"]
+                    messages = [NormMessage.from_dict(filename, d) for d in data["messages"]]
+                    report.files.append((filename, data["handled"], messages))
+        except OSError as e:
+            raise MergeError(f"{path}: {e.strerror}")
+        except (ValueError, KeyError, TypeError) as e:
+            raise MergeError(f"{path}: invalid partial report ({e})")
+
+        if report.norm_ok is None:
+            raise MergeError(f"{path}: incomplete partial report")
+
+        return report
+
+def check_shards(reports: list):
+    """Raises MergeError unless the reports of a sharded run cover each of
+    its shards exactly once"""
+
+    shards = [report.shard for report in reports if report.shard is not None]
+    if len(shards) == 0:
+        return
+    if len(shards) != len(reports):
+        raise MergeError("cannot merge sharded and unsharded reports")
+
+    count = shards[0][1]
+    if any(shard_count != count for _, shard_count in shards):
+        raise MergeError("the reports are not shards of the same run")
+
+    indexes = sorted(index for index, _ in shards)
+    if indexes != list(range(1, count + 1)):
+        missing = sorted(set(range(1, count + 1)).difference(indexes))
+        if len(missing) > 0:
+            raise MergeError(f"missing shards: {', '.join(f'{i}/{count}' for i in missing)}")
+        raise MergeError("some shards are given more than once")
+
+def merge(reports: list, reporter) -> bool:
+    """Report the results of partial reports ordered by file name, returns
+    True if none of them has norm violations"""
+
+    files = dict()
+    for report in reports:
+        for filename, handled, messages in report.files:
+            previous = files.get(filename)
+            if previous is None:
+                files[filename] = CheckResult(pathlib.Path(filename), messages, handled)
+            else:
+                previous.messages = previous.messages + messages
+                previous.handled = previous.handled or handled
+
+    norm_ok = all(report.norm_ok for report in reports)
+    reporter.start()
+    for filename in sorted(files):
+        result = files[filename]
+        result.messages.sort(key=lambda x: x.line)
+        reporter.file_result(result)
+        if not result.norm_ok():
+            norm_ok = False
+    reporter.finish(norm_ok)
+
+    return norm_ok
+
+def main(argv=None) -> int:
+    """moulinorme merge: combine partial reports (-f partial) into one"""
+
+    arg_parser = ArgumentParser(prog="moulinorme merge", description=f"Moulinorme {moulinorme.__version__}: merge partial reports")
+    arg_parser.add_argument("-v", "--verbose", dest="verbose", action="store_true", help="Increase verbosity")
+    arg_parser.add_argument("-n", "--no-color", dest="no_color", action="store_true", help="Don't colorize output")
+    arg_parser.add_argument("-f", "--format", dest="format", choices=REPORTERS.keys(), default="text", help="Output format (default: text)")
+    arg_parser.add_argument(dest="reports", nargs="+", type=pathlib.Path, help="Partial reports to merge")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        reports = [PartialReport.read(path) for path in args.reports]
+        check_shards(reports)
+    except MergeError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    colorize = sys.stdout.isatty() and sys.stderr.isatty() and not args.no_color
+    reporter = REPORTERS[args.format](sys.stdout, colorize=colorize, verbose=args.verbose)
+
+    return 0 if merge(reports, reporter) else 1
@@ -0,0 +1,130 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import heapq
+import json
+
+class Profiler:
+    """Record the wall time and call count of the checks, the time spent on
+    each file and the number of violations of each rule"""
+
+    def __init__(self, top_files: int = 10):
+        self.top_files = top_files
+        self.checks = dict()
+        self.files = list()
+        self.files_count = 0
+        self.files_time = 0.0
+        self.rules = dict()
+
+    def record(self, name: str, seconds: float):
+        """Record a call of a check (or of file reading)"""
+
+        stats = self.checks.get(name)
+        if stats is None:
+            self.checks[name] = [1, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+
+    def record_file(self, filename: str, seconds: float):
+        """Record the time spent on a file, only the slowest ones are kept"""
+
+        self.files_count += 1
+        self.files_time += seconds
+        if len(self.files) < self.top_files:
+            heapq.heappush(self.files, (seconds, filename))
+        else:
+            heapq.heappushpop(self.files, (seconds, filename))
+
+    def count_messages(self, messages):
+        """Count the violations of each rule"""
+
+        for message in messages:
+            if not message.is_ok():
+                rule = message.rule or "?"
+                self.rules[rule] = self.rules.get(rule, 0) + 1
+
+    def merge(self, other):
+        """Add the records of another Profiler to this one"""
+
+        for name, (calls, seconds) in other.checks.items():
+            stats = self.checks.setdefault(name, [0, 0.0])
+            stats[0] += calls
+            stats[1] += seconds
+
+        for seconds, filename in other.files:
+            if len(self.files) < self.top_files:
+                heapq.heappush(self.files, (seconds, filename))
+            else:
+                heapq.heappushpop(self.files, (seconds, filename))
+
+        self.files_count += other.files_count
+        self.files_time += other.files_time
+        for rule, count in other.rules.items():
+            self.rules[rule] = self.rules.get(rule, 0) + count
+
+    def slowest_files(self) -> list:
+        return sorted(self.files, reverse=True)
+
+    def to_dict(self) -> dict:
+        return {
+            "checks": {
+                name: {"calls": calls, "seconds": seconds}
+                for name, (calls, seconds) in sorted(self.checks.items())
+            },
+            "files": {
+                "count": self.files_count,
+                "seconds": self.files_time,
+                "slowest": [
+                    {"file": filename, "seconds": seconds}
+                    for seconds, filename in self.slowest_files()
+                ]
+            },
+            "rules": dict(sorted(self.rules.items()))
+        }
+
+    def dump(self, filename: str):
+        with open(filename, "w") as h:
+            json.dump(self.to_dict(), h, indent=4)
+
+    def summary(self) -> str:
+        """Returns the records as human readable tables"""
+
+        lines = [f"{'Check':<28} {'Calls':>8} {'Total (ms)':>12} {'Mean (ms)':>12}"]
+        for name, (calls, seconds) in sorted(self.checks.items(), key=lambda x: x[1][1], reverse=True):
+            lines.append(f"{name:<28} {calls:>8} {seconds * 1000:>12.2f} {seconds * 1000 / calls:>12.3f}")
+
+        lines.append("")
+        lines.append(f"{'Rule':<28} {'Violations':>8}")
+        for rule, count in sorted(self.rules.items()):
+            lines.append(f"{rule:<28} {count:>8}")
+
+        lines.append("")
+        lines.append(f"{self.files_count} files checked in {self.files_time * 1000:.2f} ms, slowest files:")
+        for seconds, filename in self.slowest_files():
+            lines.append(f"{seconds * 1000:>12.2f} ms  {filename}")
+
+        lines.append("")
+        return "\n".join(lines)
@@ -0,0 +1,169 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.types import NormMessage, SeverityMajor, SeverityMinor
+from moulinorme.rules import RuleSet, ALL_RULES
+import pathlib
+import os
+
+class FileSymbols:
+    """Symbols of a checked file, see lexer.index_symbols()"""
+
+    __slots__ = ("path", "is_header", "definitions", "prototypes", "declarations", "includes", "references")
+
+    def __init__(self, path: pathlib.Path, symbols: dict):
+        self.path = path
+        self.is_header = path.suffix == ".h"
+        self.definitions = symbols["definitions"]
+        self.prototypes = symbols["prototypes"]
+        self.declarations = symbols["declarations"]
+        self.includes = symbols["includes"]
+        self.references = symbols["references"]
+
+class ProjectIndex:
+    """Index of the function definitions, prototypes and includes of every
+    checked file, built as the results of the checks come in
+
+    Once every file was added, check() runs the cross-file rules on the
+    index without reading the files again.
+    """
+
+    def __init__(self, rules: RuleSet = None):
+        self.rules = ALL_RULES if rules is None else rules
+        self.files = list()
+        self.definitions = dict()
+        self.references = set()
+        self.headers = dict()
+        self.declared = dict()
+
+    def add(self, path: pathlib.Path, symbols: dict):
+        """Add the symbols of a checked file"""
+
+        file_symbols = FileSymbols(path, symbols)
+        self.files.append(file_symbols)
+        self.references.update(file_symbols.references)
+
+        for name, line_nb in file_symbols.definitions:
+            self.definitions.setdefault(name, list()).append((path, line_nb))
+
+        if file_symbols.is_header:
+            self.headers.setdefault(path.name, list()).append(file_symbols)
+
+    def resolve_include(self, including: FileSymbols, header: str) -> list:
+        """Returns the indexed headers that an include directive may refer to"""
+
+        header_path = pathlib.PurePosixPath(header)
+        local_path = pathlib.Path(os.path.normpath(including.path.parent / header_path))
+        parts = tuple(part for part in header_path.parts if part not in (".", ".."))
+
+        candidates = [
+            file_symbols for file_symbols in self.headers.get(header_path.name, ())
+            if file_symbols.path.parts[-len(parts):] == parts
+        ]
+        for file_symbols in candidates:
+            if file_symbols.path == local_path:
+                return [file_symbols]
+
+        return candidates
+
+    def header_declarations(self, header: FileSymbols) -> set:
+        """Returns the names declared by header and the headers it includes"""
+
+        declarations = self.declared.get(header.path)
+        if declarations is not None:
+            return declarations
+
+        declarations = set()
+        seen = set()
+        pending = [header]
+        while pending:
+            current = pending.pop()
+            if current.path in seen:
+                continue
+            seen.add(current.path)
+            declarations.update(current.declarations)
+            for include, _ in current.includes:
+                pending.extend(self.resolve_include(current, include))
+
+        self.declared[header.path] = declarations
+        return declarations
+
+    def include_needed(self, file_symbols: FileSymbols, headers: list) -> bool:
+        """Returns True if file_symbols uses a name declared by one of the
+        headers (or if nothing is known about what they declare)"""
+
+        for header in headers:
+            declarations = self.header_declarations(header)
+            if len(declarations) == 0:
+                return True
+
+            if not declarations.isdisjoint(file_symbols.references):
+                return True
+
+            for name, _ in file_symbols.definitions:
+                if name in declarations:
+                    return True
+
+        return False
+
+    def check_file(self, file_symbols: FileSymbols) -> list:
+        """Returns the cross-file norm messages of a single file"""
+
+        rules = self.rules
+        filename = str(file_symbols.path)
+        messages = list()
+
+        for name, line_nb in file_symbols.definitions:
+            first_path, first_line_nb = self.definitions[name][0]
+            if rules.enabled("P1") and (first_path, first_line_nb) != (file_symbols.path, line_nb):
+                messages.append(NormMessage(filename, line_nb, f"P1, function '{name}' is already defined in {first_path}:{first_line_nb}", SeverityMajor()))
+
+            if rules.enabled("P2") and name != "main" and name not in self.references:
+                messages.append(NormMessage(filename, line_nb, f"P2, function '{name}' is never used", SeverityMinor()))
+
+        if rules.enabled("P3"):
+            for name, line_nb in file_symbols.prototypes:
+                if name not in self.definitions:
+                    messages.append(NormMessage(filename, line_nb, f"P3, function '{name}' is declared but never defined", SeverityMinor()))
+
+        # Headers commonly include the headers their includers need, so only
+        # the includes of source files are checked
+        if rules.enabled("P4") and not file_symbols.is_header:
+            for include, line_nb in file_symbols.includes:
+                headers = self.resolve_include(file_symbols, include)
+                if len(headers) > 0 and not self.include_needed(file_symbols, headers):
+                    messages.append(NormMessage(filename, line_nb, f"P4, header '{include}' is included but never needed", SeverityMinor()))
+
+        messages.sort(key=lambda x: x.line)
+        return messages
+
+    def check(self):
+        """Yield (path, messages) for every indexed file with cross-file norm
+        violations"""
+
+        for file_symbols in self.files:
+            messages = self.check_file(file_symbols)
+            if len(messages) > 0:
+                yield file_symbols.path, messages
@@ -0,0 +1,171 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from collections.abc import Sequence
+import codecs
+import mmap
+import re
+
+# Files larger than this are memory-mapped and their lines decoded on access
+MMAP_THRESHOLD = 1024 * 1024
+
+NEWLINE_RE = re.compile(rb"\r\n?|\n")
+
+# Policies for files that are not valid UTF-8 text, see CheckOptions
+ENCODING_ERRORS = ("replace", "report", "skip")
+
+class SourceDecodeError(ValueError):
+    """Raised when a source file is not valid UTF-8 and errors are strict"""
+
+    def __init__(self, line: int, error: UnicodeDecodeError):
+        super().__init__(f"not valid UTF-8 text (line {line}: {error.reason})")
+        self.line = line
+        self.error = error
+
+def normalize_text(text: str, tabsize: int) -> list:
+    """Split text into lines without line endings (like a file opened in text
+    mode) and with tabs expanded"""
+
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if "\t" in text:
+        # expandtabs() restarts counting columns after each newline
+        text = text.expandtabs(tabsize)
+
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+
+    return lines
+
+def line_bounds(data) -> list:
+    """Returns the (start, end) offsets of the lines of data (bytes or mmap),
+    line endings excluded"""
+
+    bounds = list()
+    start = 0
+    size = len(data)
+
+    if data.find(b"\r") == -1:
+        while start < size:
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = size
+            bounds.append((start, end))
+            start = end + 1
+    else:
+        for match in NEWLINE_RE.finditer(data):
+            bounds.append((start, match.start()))
+            start = match.end()
+        if start < size:
+            bounds.append((start, size))
+
+    return bounds
+
+class MappedLines(Sequence):
+    """Lines of a memory-mapped file, only decoded when accessed"""
+
+    def __init__(self, data, tabsize: int = 1, errors: str = "replace"):
+        self._data = data
+        self._tabsize = tabsize
+        self._errors = errors
+        bounds = line_bounds(data)
+        self._starts = [start for start, _ in bounds]
+        self._ends = [end for _, end in bounds]
+
+    def _decode(self, start: int, end: int) -> str:
+        line = self._data[start:end].decode("utf-8", self._errors)
+        if "\t" in line:
+            line = line.expandtabs(self._tabsize)
+        return line
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(start, end) for start, end in zip(self._starts[index], self._ends[index])]
+
+        return self._decode(self._starts[index], self._ends[index])
+
+    def __iter__(self):
+        decode = self._decode
+        for start, end in zip(self._starts, self._ends):
+            yield decode(start, end)
+
+def check_utf8(data):
+    """Raise SourceDecodeError if data is not valid UTF-8, without decoding
+    it all at once"""
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    chunk_size = 1024 * 1024
+    offset = 0
+    while True:
+        chunk = data[offset:offset + chunk_size]
+        final = len(chunk) < chunk_size
+        try:
+            decoder.decode(chunk, final)
+        except UnicodeDecodeError as e:
+            error_offset = offset + e.start
+            raise SourceDecodeError(len(NEWLINE_RE.findall(data[:error_offset])) + 1, e)
+
+        if final:
+            return
+        offset += chunk_size
+
+def decode_bytes(data, tabsize: int = 1, errors: str = "replace") -> list:
+    """Returns the lines of bytes as strings, see read_lines() for errors"""
+
+    try:
+        text = codecs.decode(data, "utf-8", errors)
+    except UnicodeDecodeError as e:
+        raise SourceDecodeError(len(NEWLINE_RE.findall(data[:e.start])) + 1, e)
+
+    return normalize_text(text, tabsize)
+
+def read_lines(path, tabsize: int = 1, errors: str = "replace"):
+    """Read a file and return (data, lines)
+
+    Small files are read and decoded at once, larger files are memory-mapped
+    and their lines are only decoded when accessed. data is the bytes (or
+    mmap) of the file. errors is the decoding error handler, with "strict"
+    undecodable files raise SourceDecodeError.
+    """
+
+    with open(path, "rb") as h:
+        h.seek(0, 2)
+        size = h.tell()
+        h.seek(0)
+
+        if size < MMAP_THRESHOLD:
+            data = h.read()
+            return data, decode_bytes(data, tabsize, errors)
+
+        data = mmap.mmap(h.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if errors == "strict":
+        check_utf8(data)
+
+    return data, MappedLines(data, tabsize, errors)
@@ -0,0 +1,191 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.types import TermStyle, format_messages
+from moulinorme.rules import RULES
+import moulinorme
+import pathlib
+import json
+import sys
+
+SARIF_LEVELS = {
+    "Ok": "none",
+    "Info": "note",
+    "Minor": "warning",
+    "Major": "error"
+}
+
+# Bump when the layout of partial reports changes
+PARTIAL_FORMAT = 1
+
+class Reporter:
+    """Write the results of the checks as soon as each file is checked
+
+    shard is the (index, count) of the shard of the files checked, if any.
+    """
+
+    def __init__(self, out=None, colorize=False, verbose=False, shard=None):
+        self.out = out or sys.stdout
+        self.colorize = colorize
+        self.verbose = verbose
+        self.shard = shard
+
+    def start(self):
+        pass
+
+    def file_result(self, result):
+        raise NotImplementedError()
+
+    def finish(self, norm_ok: bool):
+        pass
+
+class TextReporter(Reporter):
+    def file_result(self, result):
+        if result.handled:
+            self.out.write(format_messages(result.messages, colorize=self.colorize))
+        elif self.verbose:
+            self.out.write(f"Skipping unhandled file: {str(result.target)}\n")
+
+    def finish(self, norm_ok: bool):
+        if norm_ok:
+            if self.colorize:
+                self.out.write(f"{TermStyle.GREEN}No norm violations!{TermStyle.RESET}\n")
+            else:
+                self.out.write("No norm violations!\n")
+
+def message_dict(message) -> dict:
+    return {
+        "file": message.filename,
+        "line": message.line,
+        "column": message.column,
+        "rule": message.rule,
+        "severity": message.severity.name,
+        "message": message.text
+    }
+
+class JsonLinesReporter(Reporter):
+    """One JSON object per norm violation"""
+
+    def file_result(self, result):
+        lines = [json.dumps(message_dict(message)) for message in result.messages if not message.is_ok()]
+        if len(lines) > 0:
+            lines.append("")
+            self.out.write("\n".join(lines))
+
+class SarifReporter(Reporter):
+    """SARIF 2.1.0 log, results are written as they come in"""
+
+    def start(self):
+        log = {
+            "version": "2.1.0",
+            "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+            "runs": [{
+                "tool": {
+                    "driver": {
+                        "name": "moulinorme",
+                        "version": moulinorme.__version__,
+                        "informationUri": "https://github.com/hoot-w00t/mouli-norme",
+                        "rules": [
+                            {
+                                "id": rule.id,
+                                "shortDescription": {"text": rule.description},
+                                "defaultConfiguration": {"level": SARIF_LEVELS[rule.severity.name]}
+                            }
+                            for rule in RULES
+                        ]
+                    }
+                },
+                "results": []
+            }]
+        }
+
+        # Stream the results array in place of the empty one
+        header = json.dumps(log)
+        self._footer = header[header.rindex("[]") + 2:]
+        self.out.write(header[:header.rindex("[]") + 1])
+        self._first_result = True
+
+    def result_dict(self, message) -> dict:
+        path = pathlib.Path(message.filename)
+        location = {"artifactLocation": {"uri": path.as_uri() if path.is_absolute() else message.filename}}
+        if message.line > 0:
+            location["region"] = {"startLine": message.line}
+            if message.column > 0:
+                location["region"]["startColumn"] = message.column
+
+        result = {
+            "level": SARIF_LEVELS[message.severity.name],
+            "message": {"text": message.text},
+            "locations": [{"physicalLocation": location}]
+        }
+        if message.rule is not None:
+            result["ruleId"] = message.rule
+
+        return result
+
+    def file_result(self, result):
+        for message in result.messages:
+            if message.is_ok():
+                continue
+
+            if not self._first_result:
+                self.out.write(",")
+            self._first_result = False
+            self.out.write(json.dumps(self.result_dict(message)))
+
+    def finish(self, norm_ok: bool):
+        self.out.write(f"]{self._footer}\n")
+
+class PartialReporter(Reporter):
+    """Partial report to combine with others using 'moulinorme merge'
+
+    JSON Lines holding a header, one object per file (unhandled ones
+    included) and a footer with the result of the run, so that a truncated
+    report can be told apart from a complete one.
+    """
+
+    def start(self):
+        header = {"partial": PARTIAL_FORMAT, "version": moulinorme.__version__}
+        if self.shard is not None:
+            header["shard"] = list(self.shard)
+        self.out.write(f"{json.dumps(header)}\n")
+
+    def file_result(self, result):
+        self.out.write(json.dumps({
+            "file": str(result.target),
+            "handled": result.handled,
+            "messages": [message.to_dict() for message in result.messages]
+        }))
+        self.out.write("\n")
+
+    def finish(self, norm_ok: bool):
+        self.out.write(f"{json.dumps({'norm_ok': norm_ok})}\n")
+
+REPORTERS = {
+    "text": TextReporter,
+    "jsonl": JsonLinesReporter,
+    "sarif": SarifReporter,
+    "partial": PartialReporter
+}
@@ -0,0 +1,118 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.types import SeverityMinor, SeverityMajor
+
+# Analyses a rule depends on, each one is only run on the types of files of
+# the enabled rules that depend on it
+ANALYSIS_HEADER = "header"
+ANALYSIS_FILENAME = "filename"
+ANALYSIS_LINES = "lines"
+ANALYSIS_FUNCTIONS = "functions"
+ANALYSIS_TOKENS = "tokens"
+ANALYSIS_DELIVERY = "delivery"
+ANALYSIS_PROJECT = "project"
+
+class Rule:
+    __slots__ = ("id", "severity", "file_types", "analysis", "description")
+
+    def __init__(self, rule_id: str, severity, file_types: tuple, analysis: str, description: str):
+        self.id = rule_id
+        self.severity = severity
+        self.file_types = file_types
+        self.analysis = analysis
+        self.description = description
+
+ALL_FILES = ("Makefile", "HFile", "CFile")
+C_FILES = ("HFile", "CFile")
+
+RULES = (
+    Rule("G1", SeverityMajor, ALL_FILES, ANALYSIS_HEADER, "File header"),
+    Rule("G6", SeverityMajor, C_FILES, ANALYSIS_LINES, "Include directives should only include header files (.h)"),
+    Rule("L2", SeverityMinor, C_FILES, ANALYSIS_LINES, "Indentation"),
+    Rule("L3", SeverityMinor, ("CFile",), ANALYSIS_TOKENS, "Spaces"),
+    Rule("F2", SeverityMajor, ("CFile",), ANALYSIS_FUNCTIONS, "Naming functions"),
+    Rule("F3", SeverityMajor, ALL_FILES, ANALYSIS_LINES, "Number of columns"),
+    Rule("F4", SeverityMajor, ("CFile",), ANALYSIS_FUNCTIONS, "Number of lines"),
+    Rule("F5", SeverityMajor, ("CFile",), ANALYSIS_FUNCTIONS, "Arguments"),
+    Rule("F6", SeverityMinor, ("CFile",), ANALYSIS_TOKENS, "Comments inside a function"),
+    Rule("O1", SeverityMajor, (), ANALYSIS_DELIVERY, "Contents of the delivery folder"),
+    Rule("O3", SeverityMajor, ("CFile",), ANALYSIS_FUNCTIONS, "File coherence"),
+    Rule("O4", SeverityMajor, C_FILES, ANALYSIS_FILENAME, "Naming files and folders"),
+    Rule("P1", SeverityMajor, C_FILES, ANALYSIS_PROJECT, "Function defined more than once in the project"),
+    Rule("P2", SeverityMinor, C_FILES, ANALYSIS_PROJECT, "Function never used in the project"),
+    Rule("P3", SeverityMinor, C_FILES, ANALYSIS_PROJECT, "Prototype without a definition in the project"),
+    Rule("P4", SeverityMinor, C_FILES, ANALYSIS_PROJECT, "Header included but never needed")
+)
+
+RULES_BY_ID = {rule.id: rule for rule in RULES}
+
+def parse_rule_list(value: str) -> list:
+    """Parse a comma-separated list of rule IDs or prefixes (like 'F' for all
+    F rules), raises ValueError if one does not match any rule"""
+
+    patterns = [pattern.strip().upper() for pattern in value.split(",") if len(pattern.strip()) > 0]
+    for pattern in patterns:
+        if not any(rule_id.startswith(pattern) for rule_id in RULES_BY_ID):
+            raise ValueError(f"unknown rule: '{pattern}'")
+
+    return patterns
+
+class RuleSet:
+    """Rules enabled by select and ignore lists of rule IDs or prefixes
+
+    All rules are enabled when select is empty, ignored rules are always
+    disabled.
+    """
+
+    def __init__(self, select=(), ignore=()):
+        self.enabled_ids = frozenset(
+            rule.id for rule in RULES
+            if (len(select) == 0 or any(rule.id.startswith(p) for p in select))
+            and not any(rule.id.startswith(p) for p in ignore)
+        )
+        enabled_rules = [RULES_BY_ID[rule_id] for rule_id in self.enabled_ids]
+        self.analyses = frozenset(rule.analysis for rule in enabled_rules)
+        self.file_analyses = {
+            file_type: frozenset(rule.analysis for rule in enabled_rules if file_type in rule.file_types)
+            for file_type in ALL_FILES
+        }
+
+    def enabled(self, rule_id: str) -> bool:
+        return rule_id in self.enabled_ids
+
+    def needs(self, analysis: str, file_type: str = None) -> bool:
+        """Returns True if an enabled rule depends on this analysis (of the
+        files of file_type if it is given, like "CFile")"""
+
+        if file_type is None:
+            return analysis in self.analyses
+
+        return analysis in self.file_analyses.get(file_type, ())
+
+    def __str__(self) -> str:
+        return ",".join(sorted(self.enabled_ids))
+
+ALL_RULES = RuleSet()
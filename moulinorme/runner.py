@@ -0,0 +1,216 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.source import Makefile, HFile, CFile
+from moulinorme.types import NormMessage, SeverityMajor
+from moulinorme.profiling import Profiler
+from moulinorme.rules import RuleSet, ALL_RULES, ANALYSIS_PROJECT, ANALYSIS_DELIVERY
+from moulinorme.reader import SourceDecodeError
+from moulinorme.baseline import fingerprint_messages
+import collections
+import time
+import pathlib
+import os
+import re
+
+class Target:
+    """File to check, with its contents (str or bytes) when they are not read
+    from the disk, or the error that prevented listing it (reported instead
+    of checking it)"""
+
+    __slots__ = ("path", "content", "error")
+
+    def __init__(self, path: pathlib.Path, content=None, error: str = None):
+        self.path = path
+        self.content = content
+        self.error = error
+
+class CheckResult:
+    def __init__(self, target: pathlib.Path, messages: list, handled: bool, profile=None, symbols=None):
+        self.target = target
+        self.messages = messages
+        self.handled = handled
+        self.profile = profile
+        self.symbols = symbols
+        self.fingerprints = None
+
+    def norm_ok(self) -> bool:
+        """Returns True if no norm violations are reported in self.messages"""
+
+        for message in self.messages:
+            if not message.is_ok():
+                return False
+
+        return True
+
+SOURCE_FILE_CLASSES = (
+    (re.compile(r"^Makefile$"), Makefile),
+    (re.compile(r"^.*\.h$"), HFile),
+    (re.compile(r"^.*\.c$"), CFile)
+)
+
+def source_file_class(name: str):
+    """Return the SourceFile class that handles this file name (or None)"""
+
+    for pattern, cls in SOURCE_FILE_CLASSES:
+        if pattern.match(name):
+            return cls
+
+    return None
+
+class CheckOptions:
+    """Options of the checks, shared by every target
+
+    unnecessary: report unhandled files as O1 violations
+    cache: ResultCache to replay the messages of files already checked
+    profile: record the checks of each file to a Profiler
+    rules: RuleSet of the enabled rules
+    encoding_errors: what to do with files that are not valid UTF-8 text,
+        "replace" undecodable bytes, "report" the file or "skip" it
+    project: index the symbols of C files for the cross-file checks (see
+        ProjectIndex)
+    fingerprint_root: fingerprint the messages for a Baseline, with file
+        names relative to this directory
+    config: project Config with the settings and rules of each file, rules
+        is ignored if it is given
+    """
+
+    def __init__(self, unnecessary=False, cache=None, profile=False, rules: RuleSet = None, encoding_errors: str = "report", project=False, fingerprint_root: pathlib.Path = None, config=None):
+        self.unnecessary = unnecessary
+        self.cache = cache
+        self.profile = profile
+        self.rules = ALL_RULES if rules is None else rules
+        if config is not None:
+            self.rules = config.rules()
+        self.config = config
+        self.encoding_errors = encoding_errors
+        self.project = project and self.rules.needs(ANALYSIS_PROJECT)
+        self.fingerprint_root = fingerprint_root
+
+DEFAULT_OPTIONS = CheckOptions()
+
+def check_target(target: pathlib.Path, options: CheckOptions = None, content=None) -> CheckResult:
+    """Perform all enabled norm checks on a single target
+
+    If content is given it is checked instead of the file contents.
+    """
+
+    options = options or DEFAULT_OPTIONS
+    cache = options.cache
+    profiler = Profiler() if options.profile else None
+    start = time.perf_counter()
+
+    settings = None
+    rules = options.rules
+    if options.config is not None:
+        settings, rules = options.config.file_options(pathlib.Path(os.path.abspath(target)))
+
+    src_file = None
+    cls = source_file_class(target.name)
+    if cls is None:
+        if not (options.unnecessary and rules.needs(ANALYSIS_DELIVERY)):
+            return CheckResult(target, list(), False, profiler)
+
+        o1 = NormMessage(str(target), 0, "O1, is this file required for compilation?", SeverityMajor())
+        result = CheckResult(target, [o1], True, profiler)
+
+    else:
+        errors = "replace" if options.encoding_errors == "replace" else "strict"
+        try:
+            src_file = cls(target, content, profiler, rules, errors, settings)
+        except SourceDecodeError as e:
+            if options.encoding_errors == "skip":
+                return CheckResult(target, list(), False, profiler)
+
+            message = NormMessage(str(target), e.line, "file is not valid UTF-8 text", SeverityMajor())
+            result = CheckResult(target, [message], True, profiler)
+        else:
+            key = None if cache is None else cache.key(src_file)
+            messages = None if cache is None else cache.get(src_file, key)
+            if messages is None:
+                src_file.check_file()
+                messages = sorted(src_file.messages, key=lambda x: x.line)
+                if cache is not None:
+                    cache.put(src_file, messages, key)
+
+            symbols = None
+            if options.project and isinstance(src_file, (HFile, CFile)):
+                symbols = src_file.symbols()
+
+            result = CheckResult(target, messages, True, profiler, symbols)
+
+    if options.fingerprint_root is not None:
+        result.fingerprints = fingerprint_messages(result.messages, target, options.fingerprint_root, src_file)
+
+    if profiler is not None:
+        profiler.record_file(str(target), time.perf_counter() - start)
+
+    return result
+
+def _check(target, options: CheckOptions) -> CheckResult:
+    if isinstance(target, Target):
+        if target.error is not None:
+            message = NormMessage(str(target.path), 0, target.error, SeverityMajor())
+            return CheckResult(target.path, [message], True)
+        return check_target(target.path, options, target.content)
+
+    return check_target(target, options)
+
+def resolve_jobs(jobs: int) -> int:
+    """Return the number of workers to use, 0 meaning one per CPU"""
+
+    if jobs <= 0:
+        return os.cpu_count() or 1
+
+    return jobs
+
+def run_checks(targets, jobs=1, options: CheckOptions = None):
+    """Check targets (paths or Target objects) and yield their CheckResult in
+    the same order as targets
+
+    With more than one job the checks are spread over a process pool, a
+    bounded number of targets is kept in flight so that results are yielded
+    as soon as the oldest pending target is done.
+    """
+
+    options = options or DEFAULT_OPTIONS
+    jobs = resolve_jobs(jobs)
+    if jobs == 1:
+        for target in targets:
+            yield _check(target, options)
+        return
+
+    # Only imported when needed, it is slow to import
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = collections.deque()
+        for target in targets:
+            pending.append(executor.submit(_check, target, options))
+            if len(pending) >= jobs * 4:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,110 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.runner import Target
+import hashlib
+import pathlib
+import os
+
+def parse_shard(value: str) -> tuple:
+    """Parse a shard given as 'i/N' (1 <= i <= N), raises ValueError"""
+
+    index, _, count = value.partition("/")
+    index, count = int(index), int(count)
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"invalid shard: '{value}'")
+
+    return index, count
+
+def target_path(target) -> pathlib.Path:
+    return target.path if isinstance(target, Target) else target
+
+def shard_name(path: pathlib.Path, root: pathlib.Path) -> str:
+    """Returns the name of a path used to shard it, relative to root when it
+    is inside of it so that it does not depend on where the tree is"""
+
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+def shard_of(name: str, count: int) -> int:
+    """Returns the shard (1 to count) of a file name"""
+
+    digest = hashlib.blake2b(name.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+def hash_shard(targets, index: int, count: int, root: pathlib.Path):
+    """Yield the targets of shard index out of count, by hash of their name
+
+    Targets are filtered as they come in, every file always lands in the
+    same shard.
+    """
+
+    for target in targets:
+        if shard_of(shard_name(target_path(target), root), count) == index:
+            yield target
+
+def target_size(target) -> int:
+    if isinstance(target, Target) and target.content is not None:
+        return len(target.content)
+
+    try:
+        return os.stat(str(target_path(target))).st_size
+    except OSError:
+        return 0
+
+def size_shard(targets, index: int, count: int, root: pathlib.Path) -> list:
+    """Returns the targets of shard index out of count, balancing the total
+    size of the files of each shard
+
+    The largest files are assigned first, each one to the shard with the
+    smallest total size so far. Ties are broken by name so that every node
+    computes the same assignment (given the same files).
+    """
+
+    sized = sorted(
+        ((target_size(target), shard_name(target_path(target), root), target) for target in targets),
+        key=lambda x: (-x[0], x[1])
+    )
+
+    totals = [0] * count
+    selected = list()
+    for size, name, target in sized:
+        shard = min(range(count), key=lambda i: totals[i])
+        totals[shard] += size
+        if shard + 1 == index:
+            selected.append((name, target))
+
+    return [target for _, target in sorted(selected, key=lambda x: x[0])]
+
+def shard_targets(targets, index: int, count: int, root: pathlib.Path, strategy: str = "hash"):
+    """Returns the targets of a shard, assigned by hash of their name or by
+    balancing their sizes (strategy "hash" or "size")"""
+
+    if strategy == "size":
+        return size_shard(targets, index, count, root)
+
+    return hash_shard(targets, index, count, root)
@@ -23,14 +23,51 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from moulinorme.types import Severity, SeverityOk, SeverityInfo, SeverityMinor, SeverityMajor, NormMessage
+from moulinorme.types import Severity, SeverityOk, SeverityInfo, SeverityMinor, SeverityMajor, NormMessage, format_messages
+from moulinorme.rules import RuleSet, ALL_RULES, ANALYSIS_HEADER, ANALYSIS_FILENAME, ANALYSIS_LINES, ANALYSIS_FUNCTIONS, ANALYSIS_TOKENS
+from moulinorme import lexer, reader
 import pathlib
+import functools
 import typing
+import time
 import re
+import sys
 import os
 
+INCLUDE_RE = re.compile(r'^\#include(.*)["<](.*)[">](.*)$')
+INCLUDE_HEADER_RE = re.compile(r'^\#include(.*)["<](.*)\.h[">](.*)$')
+SNAKE_CASE_RE = re.compile("^([a-z0-9_]*)$")
+
+@functools.lru_cache(maxsize=None)
+def header_project_re(header_mid: str):
+    """Returns the compiled pattern of the project line of a file header"""
+
+    return re.compile(f"^{re.escape(header_mid)} EPITECH PROJECT, \\d\\d\\d\\d$")
+
+def profiled(method):
+    """Record the calls of a SourceFile method to its profiler (if it has one)"""
+
+    name = method.__name__.lstrip("_")
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if profiler is None:
+            return method(self, *args, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            profiler.record(name, time.perf_counter() - start)
+
+    return wrapper
+
 class SourceFile:
-    def __init__(self, filename: [typing.Union[str, pathlib.Path]]):
+    def __init__(self, filename: [typing.Union[str, pathlib.Path]], content: typing.Union[str, bytes] = None, profiler=None, rules: RuleSet = None, encoding_errors: str = "replace", settings: dict = None):
+        self.profiler = profiler
+        self.rules = ALL_RULES if rules is None else rules
+
         self._header_start = "/*"
         self._header_mid = "**"
         self._header_end = "*/"
@@ -38,41 +75,96 @@ class SourceFile:
         self._tabsize = 1
         self._indent_size = 4
         self._max_columns = 80
+        self._encoding_errors = encoding_errors
+        self.apply_settings(settings)
 
         if isinstance(filename, pathlib.Path):
             self._filename = filename
         else:
             self._filename = pathlib.Path(filename).expanduser().resolve()
+        self.display_name = sys.intern(str(self._filename))
 
-        self._readlines()
+        self._readlines(content)
         self.messages = list()
 
-    def _readlines(self):
-        with self._filename.open("r") as h:
-            self.raw_lines = h.readlines()
+    @profiled
+    def _readlines(self, content: typing.Union[str, bytes] = None):
+        """Read the lines of the file (or of content) without line endings
+        and with tabs expanded, decoding errors are handled according to
+        self._encoding_errors
+
+        The raw contents are kept in self.contents, a public attribute since
+        settings() collects the underscore ones.
+        """
+
+        if content is None:
+            self.contents, self.lines = reader.read_lines(self._filename, self._tabsize, self._encoding_errors)
+        elif isinstance(content, bytes):
+            self.contents = content
+            self.lines = reader.decode_bytes(content, self._tabsize, self._encoding_errors)
+        else:
+            self.contents = content
+            self.lines = reader.normalize_text(content, self._tabsize)
+
+    def apply_settings(self, settings: dict = None):
+        """Override the settings of the norm checks (like max_columns) that
+        apply to this kind of file"""
+
+        for name, value in (settings or dict()).items():
+            if hasattr(self, f"_{name}"):
+                setattr(self, f"_{name}", value)
+
+    def needs(self, analysis: str) -> bool:
+        """Returns True if an enabled rule depends on this analysis of this
+        kind of file"""
+
+        return self.rules.needs(analysis, type(self).__name__)
+
+    def digest(self) -> bytes:
+        """Returns the SHA-256 digest of the file contents"""
+
+        import hashlib
+
+        data = self.contents
+        if isinstance(data, str):
+            data = data.encode("utf-8", "surrogatepass")
+
+        return hashlib.sha256(data).digest()
+
+    def settings(self) -> dict:
+        """Returns the settings in use by the norm checks"""
 
-        self.lines = [line.replace("\n", "").expandtabs(tabsize=self._tabsize) for line in self.raw_lines]
+        settings = {
+            name.lstrip("_"): value
+            for name, value in vars(self).items()
+            if name.startswith("_") and isinstance(value, (str, int, float, bool))
+        }
+        settings["rules"] = str(self.rules)
 
-    def append_message(self, line: int, message: str, severity: Severity):
+        return settings
+
+    def append_message(self, line: int, message: str, severity: Severity, column: int = 0):
         self.messages.append(NormMessage(
-            str(self._filename),
+            self.display_name,
             line,
             message,
-            severity
+            severity,
+            column,
+            validate=False
         ))
 
-    def print_messages(self, colorize=False, include_ok=False, sort_by_line=True):
-        """Print norm messages to stdout"""
+    def format_messages(self, colorize=False, include_ok=False, sort_by_line=True) -> str:
+        """Format norm messages to a single string"""
 
         if sort_by_line:
             self.messages.sort(key=lambda x: x.line)
 
-        for message in self.messages:
-            if not message.is_ok() or include_ok:
-                if colorize:
-                    print(message.colorized())
-                else:
-                    print(str(message))
+        return format_messages(self.messages, colorize=colorize, include_ok=include_ok)
+
+    def print_messages(self, colorize=False, include_ok=False, sort_by_line=True):
+        """Print norm messages to stdout"""
+
+        sys.stdout.write(self.format_messages(colorize=colorize, include_ok=include_ok, sort_by_line=sort_by_line))
 
     def norm_ok(self) -> bool:
         """Returns True if no norm violations are reported in self.messages"""
@@ -83,6 +175,7 @@ class SourceFile:
 
         return True
 
+    @profiled
     def check_header(self):
         """Check if source file header is valid"""
 
@@ -93,7 +186,7 @@ class SourceFile:
         invalid = list()
         if self.lines[0] != self._header_start:
             invalid.append(1)
-        if not re.match(f"^{re.escape(self._header_mid)} EPITECH PROJECT, \\d\\d\\d\\d$", self.lines[1]):
+        if not header_project_re(self._header_mid).match(self.lines[1]):
             invalid.append(2)
         if len(self.lines[2].rstrip()) < len(self.lines[2]) or not self.lines[2].startswith(self._header_mid):
             invalid.append(3)
@@ -110,221 +203,273 @@ class SourceFile:
             for line_nb in invalid:
                 self.append_message(line_nb, "G1, invalid header", SeverityMajor())
 
-    def check_columns(self):
-        """Check if any line exceeds _max_columns width (tabs expanded to _tabsize spaces)"""
+    @profiled
+    def scan_lines(self, columns=False, indent=False, trailing_whitespace=False, includes=False, previous: dict = None):
+        """Perform the selected line by line checks in a single pass over self.lines
 
-        line_nb = 1
-        for line in self.lines:
-            line_len = len(line) + 1
-            if line_len > self._max_columns:
-                self.append_message(line_nb, f"F3, too long line ({line_len} columns)", SeverityMajor())
+        columns: check if any line exceeds _max_columns width (tabs expanded to _tabsize spaces)
+        indent: check if indentation is valid (indent dividable by _indent_size)
+        trailing_whitespace: check if lines have trailing whitespace
+        includes: check if include directives only include header files (.h)
+
+        previous is the checked_lines attribute of an earlier scan with the
+        same checks, lines found in it are not checked again: their messages
+        are reused. checked_lines is only set when previous is given.
+        """
 
+        messages = self.messages
+        append_message = self.append_message
+        max_columns = self._max_columns
+        indent_size = self._indent_size
+        strip_needed = indent or trailing_whitespace or includes
+        checked = None if previous is None else dict()
+
+        line_nb = 0
+        for line in self.lines:
             line_nb += 1
 
+            if checked is not None:
+                line_messages = previous.get(line)
+                if line_messages is not None:
+                    for message, severity, column in line_messages:
+                        append_message(line_nb, message, severity, column)
+                    checked[line] = line_messages
+                    continue
+                start = len(messages)
+
+            if columns:
+                line_len = len(line) + 1
+                if line_len > max_columns:
+                    append_message(line_nb, f"F3, too long line ({line_len} columns)", SeverityMajor(), max_columns)
+
+            if strip_needed:
+                rstripped = line.rstrip()
+                stripped = rstripped.lstrip()
+
+                line_indent = len(rstripped) - len(stripped)
+                if indent and line_indent % indent_size != 0:
+                    append_message(line_nb, "L2, invalid indentation", SeverityMinor(), line_indent + 1)
+
+                if trailing_whitespace and len(rstripped) < len(line):
+                    append_message(line_nb, "L2, trailing whitespace", SeverityMinor(), len(rstripped) + 1)
+
+                if includes and stripped.startswith("#include") \
+                        and INCLUDE_RE.match(stripped) and not INCLUDE_HEADER_RE.match(stripped):
+                    append_message(line_nb, "G6, include directives should only include header files", SeverityMajor(), line_indent + 1)
+
+            if checked is not None:
+                checked[line] = [(m.message, m.severity, m.column) for m in messages[start:]]
+
+        if checked is not None:
+            self.checked_lines = checked
+
+    @profiled
+    def check_columns(self):
+        """Check if any line exceeds _max_columns width (tabs expanded to _tabsize spaces)"""
+
+        self.scan_lines(columns=True)
+
+    @profiled
     def check_file(self):
-        """Perform all norm checks"""
+        """Perform all enabled norm checks"""
 
-        self.check_header()
-        self.check_columns()
+        if self.needs(ANALYSIS_HEADER):
+            self.check_header()
+        if self.needs(ANALYSIS_LINES):
+            self.check_columns()
 
     def snake_case(self, name: str) -> bool:
-        return True if re.match("^([a-z0-9_]*)$", name) else False
+        return True if SNAKE_CASE_RE.match(name) else False
 
 class Makefile(SourceFile):
-    def __init__(self, filename: [typing.Union[str, pathlib.Path]]):
-        super().__init__(filename)
+    def __init__(self, filename: [typing.Union[str, pathlib.Path]], content: typing.Union[str, bytes] = None, profiler=None, rules: RuleSet = None, encoding_errors: str = "replace", settings: dict = None):
+        super().__init__(filename, content, profiler, rules, encoding_errors, settings)
 
         self._header_start = "##"
         self._header_mid = "##"
         self._header_end = "##"
 
 class CFileDefs(SourceFile):
-    def __init__(self, filename: [typing.Union[str, pathlib.Path]]):
-        super().__init__(filename)
+    def __init__(self, filename: [typing.Union[str, pathlib.Path]], content: typing.Union[str, bytes] = None, profiler=None, rules: RuleSet = None, encoding_errors: str = "replace", settings: dict = None):
+        super().__init__(filename, content, profiler, rules, encoding_errors, settings)
 
         self._max_funcs = 5
         self._max_func_lines = 20
         self._max_func_args = 4
+        self.apply_settings(settings)
 
+    @profiled
     def check_filename(self):
         if not self.snake_case(os.path.splitext(self._filename.name)[0]):
             self.append_message(0, "O4, file name does not respect snake case convention", SeverityMajor())
 
+    @profiled
     def check_indent(self):
         """Check if indentation is valid (indent dividable by _indent_size)"""
 
-        line_nb = 1
-        for line in self.lines:
-            line_indent = len(line.rstrip()) - len(line.strip())
-            if line_indent % self._indent_size != 0:
-                self.append_message(line_nb, "L2, invalid indentation", SeverityMinor())
-
-            line_nb += 1
+        self.scan_lines(indent=True)
 
+    @profiled
     def check_trailing_whitespace(self):
         """Check if lines have trailing whitespace"""
 
-        line_nb = 1
-        for line in self.lines:
-            if len(line.rstrip()) < len(line):
-                self.append_message(line_nb, "L2, trailing whitespace", SeverityMinor())
+        self.scan_lines(trailing_whitespace=True)
 
-            line_nb += 1
+    @profiled
+    def check_line_rules(self, previous_lines: dict = None):
+        """Perform all enabled line by line checks in a single pass (see
+        scan_lines() for previous_lines)"""
+
+        columns = self.rules.enabled("F3")
+        indent = self.rules.enabled("L2")
+        includes = self.rules.enabled("G6")
+
+        if columns or indent or includes:
+            self.scan_lines(columns=columns, indent=indent, trailing_whitespace=indent, includes=includes, previous=previous_lines)
+
+    def __getattr__(self, name):
+        # Functions are only extracted when they are first needed
+        if name == "functions":
+            self.extract_functions()
+            return self.functions
+
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
 
     def extract_prototype_name(self, prototype: str):
         """Extract function name from its prototype"""
 
-        start = prototype.find(" ") + 1
-        end = prototype.find("(", start)
-
-        return prototype[start:end].replace("*", "").strip()
+        return lexer.prototype_name(prototype)
 
     def extract_prototype_args(self, prototype: str):
         """Extract function arguments from its prototype"""
 
-        start = prototype.find("(") + 1
-        end = prototype.find(")", start)
-        argw = prototype[start:end].strip()
+        return lexer.prototype_args(prototype)
 
-        if len(argw) == 0:
-            return None
-
-        if argw == "void":
-            return list()
+    @profiled
+    def extract_functions(self):
+        """Find all function definitions (and tokenize their body if a rule needs it)"""
 
-        args = []
-        for arg in argw.split(","):
-            args.append(arg.strip())
+        self.functions = lexer.index_functions(self.lines, tokenize=self.needs(ANALYSIS_TOKENS))
 
-        return args
+    @profiled
+    def symbols(self) -> dict:
+        """Index the function definitions, prototypes, includes and
+        identifiers of the file (see lexer.index_symbols())"""
 
-    def extract_functions(self):
-        self.functions = list()
-
-        line_range = iter(range(0, len(self.lines)))
-        for i in line_range:
-            line_nb = i + 1
-            line = self.lines[i]
-            function = None
-
-            if re.match("^([a-zA-Z0-9_\\*]*) ([a-zA-Z0-9_\*]*)\((.*)\)$", line):
-                function = {
-                    "prototype": line,
-                    "prototype_line_nb": line_nb,
-                    "first_line_nb": line_nb + 2,
-                    "lines": []
-                }
-                i = next(line_range)
-                i = next(line_range)
-
-            elif re.match("^([a-zA-Z0-9_\\*]*) ([a-zA-Z0-9_\*]*)\((.*),$", line):
-                prototype = line
-
-                i = next(line_range)
-                while not self.lines[i].startswith("{"):
-                    prototype += f" {self.lines[i].strip()}"
-                    i = next(line_range)
-
-                function = {
-                    "prototype": prototype,
-                    "prototype_line_nb": line_nb,
-                    "first_line_nb": i + 2,
-                    "lines": []
-                }
-                i = next(line_range)
-
-            if function is not None:
-                function["name"] = self.extract_prototype_name(function["prototype"])
-                function["args"] = self.extract_prototype_args(function["prototype"])
-
-                while not self.lines[i].startswith("}"):
-                    function["lines"].append(self.lines[i])
-                    i = next(line_range)
-
-                self.functions.append(function)
+        return lexer.index_symbols(self.lines, self.functions)
 
+    @profiled
     def check_function(self, function):
-        if not self.snake_case(function["name"]):
+        rules = self.rules
+
+        if rules.enabled("F2") and not self.snake_case(function["name"]):
             self.append_message(function["prototype_line_nb"], "F2, function name does not respect snake case convention", SeverityMajor())
 
         args_count = 0 if function["args"] is None else len(function["args"])
-        if function["args"] is None:
+        if not rules.enabled("F5"):
+            pass
+        elif function["args"] is None:
             self.append_message(function["prototype_line_nb"], "F5, a function with no parameters should take (void)", SeverityMajor())
         elif args_count > self._max_func_args:
             self.append_message(function["prototype_line_nb"], f"F5, function takes too many parameters ({args_count}/{self._max_func_args})", SeverityMajor())
 
         lines_count = len(function["lines"])
-        if lines_count > self._max_func_lines:
+        if rules.enabled("F4") and lines_count > self._max_func_lines:
             self.append_message(function["prototype_line_nb"], f"F4, too long function ({lines_count}/{self._max_func_lines} lines)", SeverityMajor())
 
-        for i in range(0, len(function["lines"])):
-            line_nb = function["first_line_nb"] + i
-            line = function["lines"][i].strip()
-
-            comments = [line.find(comment) for comment in ["//", "/*", "*/"]]
-            dquotes = [j for j, s in enumerate(line) if s == '"']
-            for comment in comments:
-                if comment == -1 : continue
-                lower = False
-                higher = False
-                for dquote in dquotes:
-                    if dquote < comment : lower = True
-                    if dquote > comment : higher = True
-
-                if not (lower and higher):
-                    self.append_message(line_nb, "F6, comment inside function", SeverityMinor())
-
-            for keyword in ["if", "for", "while", "return", "switch", "do"]:
-                for trail in ["(", "{"]:
-                    kp = line.find("{}{}".format(keyword, trail))
-                    if kp != -1:
-                        self.append_message(line_nb, f"L3, missing space after '{keyword}'", SeverityMinor())
+        check_comments = rules.enabled("F6")
+        check_keywords = rules.enabled("L3")
+        if not (check_comments or check_keywords):
+            return
 
-    def check_includes(self):
-        """Check if include directives only include header files (.h)"""
+        tokens = function.get("tokens")
+        if tokens is None:
+            tokens = [lexer.tokenize_line(line.strip()) for line in function["lines"]]
 
-        line_nb = 1
-        include_lines = list()
+        line_nb = function["first_line_nb"]
+        for line, line_tokens in zip(function["lines"], tokens):
+            # Token columns are relative to the stripped line
+            column = len(line) - len(line.lstrip()) + 1
 
-        for line in self.lines:
-            line = line.strip()
-            if re.match(r'^\#include(.*)["<](.*)[">](.*)$', line):
-                include_lines.append((line, line_nb))
+            if check_comments:
+                for comment in line_tokens.comments:
+                    self.append_message(line_nb, "F6, comment inside function", SeverityMinor(), column + comment)
+
+            if check_keywords:
+                for keyword, keyword_column in line_tokens.keywords:
+                    self.append_message(line_nb, f"L3, missing space after '{keyword}'", SeverityMinor(), column + keyword_column + len(keyword))
 
             line_nb += 1
 
-        for include_line in include_lines:
-            if not re.match(r'^\#include(.*)["<](.*)\.h[">](.*)$', include_line[0]):
-                self.append_message(
-                    include_line[1],
-                    "G6, include directives should only include header files",
-                    SeverityMajor()
-                )
+    @profiled
+    def check_includes(self):
+        """Check if include directives only include header files (.h)"""
+
+        self.scan_lines(includes=True)
 
 class HFile(CFileDefs):
-    def check_file(self):
-        """Perform all norm checks"""
+    @profiled
+    def check_file(self, previous_lines: dict = None):
+        """Perform all enabled norm checks (see scan_lines() for previous_lines)"""
 
-        super().check_file()
-        self.check_filename()
-        self.check_indent()
-        self.check_trailing_whitespace()
-        self.check_includes()
+        if self.needs(ANALYSIS_HEADER):
+            self.check_header()
+        if self.needs(ANALYSIS_FILENAME):
+            self.check_filename()
+        if self.needs(ANALYSIS_LINES):
+            self.check_line_rules(previous_lines)
 
 class CFile(CFileDefs):
-    def check_file(self):
-        """Perform all norm checks"""
+    @profiled
+    def check_functions(self, previous: dict = None):
+        """Perform the norm checks of every function in self.functions
 
-        self.extract_functions()
-        super().check_file()
-        self.check_filename()
-        self.check_indent()
-        self.check_trailing_whitespace()
-        self.check_includes()
-
-        funcs_nb = len(self.functions)
-        if funcs_nb > self._max_funcs:
-            self.append_message(0, f"O3, too many functions ({funcs_nb}/{self._max_funcs})", SeverityMajor())
+        previous is the checked_functions attribute of an earlier check of
+        this file, functions that did not change since then are not checked
+        again: their messages are reused (moved along with the function).
+        """
 
+        self.checked_functions = dict()
         for function in self.functions:
-            self.check_function(function)
+            key = (
+                function["prototype"],
+                function["first_line_nb"] - function["prototype_line_nb"],
+                tuple(function["lines"])
+            )
+            offset = function["prototype_line_nb"]
+            messages = None if previous is None else previous.get(key)
+
+            if messages is None:
+                start = len(self.messages)
+                self.check_function(function)
+                messages = [(m.line - offset, m.message, m.severity, m.column) for m in self.messages[start:]]
+            else:
+                for line, message, severity, column in messages:
+                    self.append_message(line + offset, message, severity, column)
+
+            self.checked_functions[key] = messages
+
+    @profiled
+    def check_file(self, previous_functions: dict = None, previous_lines: dict = None):
+        """Perform all enabled norm checks (see check_functions() for
+        previous_functions and scan_lines() for previous_lines)
+
+        Functions are only extracted if a function rule is enabled.
+        """
+
+        if self.needs(ANALYSIS_HEADER):
+            self.check_header()
+        if self.needs(ANALYSIS_FILENAME):
+            self.check_filename()
+        if self.needs(ANALYSIS_LINES):
+            self.check_line_rules(previous_lines)
+
+        if not (self.needs(ANALYSIS_FUNCTIONS) or self.needs(ANALYSIS_TOKENS)):
+            return
+
+        if self.rules.enabled("O3"):
+            funcs_nb = len(self.functions)
+            if funcs_nb > self._max_funcs:
+                self.append_message(0, f"O3, too many functions ({funcs_nb}/{self._max_funcs})", SeverityMajor())
+
+        self.check_functions(previous_functions)
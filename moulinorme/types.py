@@ -32,10 +32,22 @@ class TermStyle:
     BOLD   = '\033[1m'
 
 class Severity:
-    def __init__(self):
-        self.color = None
-        self.name = None
-        raise Exception()
+    """Base class of severities, each severity only has a single instance"""
+
+    color = None
+    name = None
+    _instance = None
+
+    def __new__(cls):
+        if cls is Severity:
+            raise Exception()
+
+        instance = cls.__dict__.get("_instance")
+        if instance is None:
+            instance = super().__new__(cls)
+            cls._instance = instance
+
+        return instance
 
     def colorized(self) -> str:
         return f"{self.color}{self.name}{TermStyle.RESET}"
@@ -44,46 +56,103 @@ class Severity:
         return self.name
 
 class SeverityOk(Severity):
-    def __init__(self):
-        self.color = TermStyle.GREEN
-        self.name = "Ok"
+    color = TermStyle.GREEN
+    name = "Ok"
 
 class SeverityInfo(Severity):
-    def __init__(self):
-        self.color = TermStyle.BLUE
-        self.name = "Info"
+    color = TermStyle.BLUE
+    name = "Info"
 
 class SeverityMinor(Severity):
-    def __init__(self):
-        self.color = TermStyle.YELLOW
-        self.name = "Minor"
+    color = TermStyle.YELLOW
+    name = "Minor"
 
 class SeverityMajor(Severity):
-    def __init__(self):
-        self.color = TermStyle.RED
-        self.name = "Major"
+    color = TermStyle.RED
+    name = "Major"
+
+SEVERITIES = {severity.name: severity for severity in (SeverityOk, SeverityInfo, SeverityMinor, SeverityMajor)}
+
+def severity_from_name(name: str) -> Severity:
+    """Return the Severity object with this name"""
+
+    try:
+        return SEVERITIES[name]()
+    except KeyError:
+        raise ValueError(f"unknown severity: '{name}'")
 
 class NormMessage:
-    def __init__(self, filename: str, line: int, message: str, severity: Severity):
-        if not isinstance(filename, str):
-            raise TypeError("filename must be a string")
-        if not isinstance(line, int):
-            raise TypeError("line must be an integer")
-        if not isinstance(message, str):
-            raise TypeError("message must be a string")
-        if not isinstance(severity, Severity):
-            raise TypeError("severity must be a Severity object")
+    __slots__ = ("filename", "line", "message", "severity", "column")
+
+    def __init__(self, filename: str, line: int, message: str, severity: Severity, column: int = 0, validate=True):
+        if validate:
+            if not isinstance(filename, str):
+                raise TypeError("filename must be a string")
+            if not isinstance(line, int):
+                raise TypeError("line must be an integer")
+            if not isinstance(message, str):
+                raise TypeError("message must be a string")
+            if not isinstance(severity, Severity):
+                raise TypeError("severity must be a Severity object")
+            if not isinstance(column, int):
+                raise TypeError("column must be an integer")
 
         self.filename = filename
         self.line = line
         self.message = message
         self.severity = severity
+        self.column = column
+
+    @property
+    def rule(self) -> str:
+        """Returns the rule ID the message is about (or None)"""
+
+        rule, sep, _ = self.message.partition(", ")
+        if sep and rule[:1].isalpha() and rule[1:].isdigit():
+            return rule
+
+        return None
+
+    @property
+    def text(self) -> str:
+        """Returns the message without its rule ID"""
+
+        if self.rule is None:
+            return self.message
+
+        return self.message.partition(", ")[2]
 
     def is_ok(self) -> bool:
         return isinstance(self.severity, SeverityOk)
 
+    def to_dict(self) -> dict:
+        return {
+            "line": self.line,
+            "column": self.column,
+            "message": self.message,
+            "severity": self.severity.name
+        }
+
+    @classmethod
+    def from_dict(cls, filename: str, d: dict):
+        return cls(filename, d["line"], d["message"], severity_from_name(d["severity"]), d.get("column", 0))
+
     def colorized(self) -> str:
         return f"{self.severity.colorized()}: {self.filename}:{TermStyle.BLUE}{self.line}{TermStyle.RESET}: {self.message}"
 
     def __str__(self) -> str:
-        return f"{str(self.severity)}: {self.filename}:{self.line}: {self.message}"
\ No newline at end of file
+        return f"{str(self.severity)}: {self.filename}:{self.line}: {self.message}"
+
+def format_messages(messages, colorize=False, include_ok=False) -> str:
+    """Format norm messages to a single string, one message per line"""
+
+    if colorize:
+        lines = [message.colorized() for message in messages if include_ok or not message.is_ok()]
+    else:
+        lines = [str(message) for message in messages if include_ok or not message.is_ok()]
+
+    if len(lines) == 0:
+        return ""
+
+    lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,229 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import pathlib
+import os
+import re
+
+def translate_glob(pattern: str) -> str:
+    """Translate a gitignore-style glob to a regular expression matching relative paths
+
+    '*' and '?' never match a '/', '**' matches any number of directories.
+    """
+
+    i = 0
+    n = len(pattern)
+    res = ""
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            res += "(?:.*/)?"
+            i += 3
+            continue
+        elif pattern.startswith("**", i):
+            res += ".*"
+            i += 2
+            continue
+        elif c == "*":
+            res += "[^/]*"
+        elif c == "?":
+            res += "[^/]"
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith("[!", i) else i + 1)
+            if end == -1:
+                res += re.escape(c)
+            else:
+                chars = pattern[i + 1:end]
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                res += f"[{chars.replace(chr(92), chr(92) * 2)}]"
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            res += re.escape(pattern[i])
+        else:
+            res += re.escape(c)
+        i += 1
+
+    return res
+
+class IgnoreRule:
+    def __init__(self, base: str, pattern: str):
+        self.negate = pattern.startswith("!")
+        if self.negate:
+            pattern = pattern[1:]
+
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+
+        # Patterns without a slash match a name at any depth, others are
+        # relative to the directory of the file they come from
+        if "/" in pattern:
+            self.base = base
+            self.regex = re.compile(translate_glob(pattern.lstrip("/")) + r"\Z")
+        else:
+            self.base = None
+            self.regex = re.compile(translate_glob(pattern) + r"\Z")
+
+    def match(self, path: str, name: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+
+        if self.base is None:
+            return self.regex.match(name) is not None
+
+        if not path.startswith(self.base):
+            return False
+
+        return self.regex.match(path[len(self.base):]) is not None
+
+class IgnoreRules:
+    """Ordered list of gitignore-style rules, the last matching rule wins"""
+
+    def __init__(self, rules=()):
+        self.rules = tuple(rules)
+
+    def extend(self, base: str, patterns):
+        """Returns new IgnoreRules with patterns relative to the base directory appended"""
+
+        base = base.rstrip(os.sep) + os.sep
+        rules = list(self.rules)
+        for pattern in patterns:
+            pattern = pattern.rstrip("\n").rstrip(" ")
+            if len(pattern) == 0 or pattern.startswith("#"):
+                continue
+
+            if pattern.startswith("\\#") or pattern.startswith("\\!"):
+                pattern = pattern[1:]
+
+            rules.append(IgnoreRule(base, pattern))
+
+        return IgnoreRules(rules)
+
+    def extend_from_file(self, base: str, filename: str):
+        """Returns new IgnoreRules with the patterns of an ignore file appended"""
+
+        try:
+            with open(filename, "r") as h:
+                return self.extend(base, h.readlines())
+        except (OSError, UnicodeDecodeError):
+            return self
+
+    def ignored(self, path: str, name: str, is_dir: bool) -> bool:
+        path = path.replace(os.sep, "/") if os.sep != "/" else path
+
+        ignored = False
+        for rule in self.rules:
+            if ignored == rule.negate and rule.match(path, name, is_dir):
+                ignored = not rule.negate
+
+        return ignored
+
+def path_skipped(rules: IgnoreRules, root: str, relpath: str) -> bool:
+    """Returns True if a file (given relative to root, with '/' separators)
+    would be skipped when walking root"""
+
+    parts = relpath.split("/")
+    path = root
+    for i, name in enumerate(parts):
+        path = os.path.join(path, name)
+        if name.startswith(".") or rules.ignored(path, name, i < len(parts) - 1):
+            return True
+
+    return False
+
+def repository_ignore_rules(directory: pathlib.Path) -> IgnoreRules:
+    """Returns the rules of the .git/info/exclude file of the git repository
+    of directory (which may be its root) and of the .gitignore files in the
+    parent directories of directory up to that root"""
+
+    parents = list()
+    for parent in (directory, *directory.parents):
+        parents.append(parent)
+        if (parent / ".git").exists():
+            break
+    else:
+        parents = list()
+
+    rules = IgnoreRules()
+    if len(parents) > 0:
+        git_root = parents[-1]
+        rules = rules.extend_from_file(str(git_root), str(git_root / ".git" / "info" / "exclude"))
+
+    # The .gitignore of directory itself is read when walking it
+    for parent in reversed(parents[1:]):
+        rules = rules.extend_from_file(str(parent), str(parent / ".gitignore"))
+
+    return rules
+
+def _walk(directory: str, recursive: bool, rules, gitignore: bool, directories: list = None):
+    if directories is not None:
+        directories.append(directory)
+    if gitignore:
+        rules = rules.extend_from_file(directory, os.path.join(directory, ".gitignore"))
+
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return
+
+    with entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+
+            is_dir = entry.is_dir()
+            if rules.rules and rules.ignored(entry.path, entry.name, is_dir):
+                continue
+
+            if is_dir:
+                if recursive:
+                    yield from _walk(entry.path, recursive, rules, gitignore, directories)
+            else:
+                yield pathlib.Path(entry.path)
+
+def explore_path(target: pathlib.Path, recursive=False, exclude=(), gitignore=True, exclude_rules: IgnoreRules = None,
+                 directories: list = None):
+    """Explore paths and yield the files found
+
+    Files and directories matching one of the exclude patterns or
+    exclude_rules (like the excluded paths of a Config), or ignored by a
+    .gitignore (if gitignore is True) are skipped, excluded directories are
+    never descended into. The paths of the directories walked are appended
+    to directories if it is given.
+    """
+
+    if not target.is_dir():
+        yield target
+        return
+
+    rules = IgnoreRules()
+    if gitignore:
+        rules = repository_ignore_rules(target)
+    if exclude_rules is not None:
+        rules = IgnoreRules(rules.rules + exclude_rules.rules)
+    rules = rules.extend(str(target), exclude)
+
+    yield from _walk(str(target), recursive, rules, gitignore, directories)
@@ -0,0 +1,336 @@
+
+"""
+MIT License
+
+Copyright (c) 2019-2021 akrocynova
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from moulinorme.source import CFile
+from moulinorme.runner import source_file_class
+from moulinorme.reader import SourceDecodeError
+from moulinorme.walk import explore_path
+from moulinorme.rules import RuleSet, ANALYSIS_DELIVERY
+from moulinorme.types import NormMessage, SeverityMajor, TermStyle, format_messages
+import ctypes.util
+import ctypes
+import itertools
+import pathlib
+import select
+import struct
+import time
+import sys
+import os
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+# Files that are only modified (not created, moved or deleted) can be checked
+# again without walking the watched paths
+MODIFIED_MASK = IN_CLOSE_WRITE
+
+EVENT_HEADER = struct.Struct("iIII")
+
+class Inotify:
+    """Minimal inotify binding (Linux only)"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.directories = dict()
+
+    def add_watch(self, directory: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self.directories[wd] = directory
+
+    def read_events(self, timeout: float = None) -> list:
+        """Wait for events and return them as (path, mask) tuples"""
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if len(readable) == 0:
+            return list()
+
+        data = os.read(self.fd, 64 * 1024)
+        events = list()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+            offset += name_len
+
+            directory = self.directories.get(wd)
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self.directories.pop(wd, None)
+            if directory is not None or mask & IN_Q_OVERFLOW:
+                events.append((os.path.join(directory or "", name), mask))
+
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+class WatchedFile:
+    __slots__ = ("stat", "messages", "handled", "functions")
+
+    def __init__(self, stat, messages: list, handled: bool, functions: dict):
+        self.stat = stat
+        self.messages = messages
+        self.handled = handled
+        self.functions = functions
+
+    def norm_ok(self) -> bool:
+        for message in self.messages:
+            if not message.is_ok():
+                return False
+
+        return True
+
+def file_stat(path: pathlib.Path):
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+
+    return (st.st_mtime_ns, st.st_size)
+
+class Watcher:
+    """Keep the checked state of every file of the watched paths in memory
+    and check again only the files that changed"""
+
+    def __init__(self, args, colorize=False, out=None, config=None):
+        self.args = args
+        self.colorize = colorize
+        self.out = out or sys.stdout
+        self.roots = [pathlib.Path(filename).expanduser().resolve() for filename in args.files]
+        self.files = dict()
+        self.rules = RuleSet(args.select, args.ignore) if config is None else config.rules()
+        self.config = config
+        self.exclude_rules = None if config is None else config.exclude_rules()
+
+        try:
+            self.inotify = Inotify()
+        except (OSError, AttributeError):
+            self.inotify = None
+
+    def walk(self, directories: list = None):
+        """Returns the files of the watched paths, the directories walked are
+        appended to directories if it is given"""
+
+        return itertools.chain.from_iterable(
+            explore_path(
+                root,
+                recursive=self.args.recursive,
+                exclude=self.args.exclude,
+                gitignore=not self.args.no_gitignore,
+                exclude_rules=self.exclude_rules,
+                directories=directories
+            )
+            for root in self.roots
+        )
+
+    def check(self, path: pathlib.Path, stat) -> WatchedFile:
+        previous = self.files.get(path)
+        cls = source_file_class(path.name)
+
+        settings = None
+        rules = self.rules
+        if self.config is not None:
+            settings, rules = self.config.file_options(path)
+
+        if cls is None:
+            if self.args.unnecessary and rules.needs(ANALYSIS_DELIVERY):
+                o1 = NormMessage(str(path), 0, "O1, is this file required for compilation?", SeverityMajor())
+                return WatchedFile(stat, [o1], True, None)
+            return WatchedFile(stat, list(), False, None)
+
+        errors = "replace" if self.args.encoding_errors == "replace" else "strict"
+        try:
+            src_file = cls(path, rules=rules, encoding_errors=errors, settings=settings)
+        except SourceDecodeError as e:
+            if self.args.encoding_errors == "skip":
+                return WatchedFile(stat, list(), False, None)
+
+            message = NormMessage(str(path), e.line, "file is not valid UTF-8 text", SeverityMajor())
+            return WatchedFile(stat, [message], True, None)
+
+        if issubclass(cls, CFile):
+            src_file.check_file(None if previous is None else previous.functions)
+            functions = getattr(src_file, "checked_functions", None)
+        else:
+            src_file.check_file()
+            functions = None
+
+        src_file.messages.sort(key=lambda x: x.line)
+        return WatchedFile(stat, src_file.messages, True, functions)
+
+    def update(self, paths) -> list:
+        """Check paths again if they changed, returns the paths that were checked"""
+
+        checked = list()
+        for path in paths:
+            stat = file_stat(path)
+            previous = self.files.get(path)
+            if stat is None:
+                if previous is not None:
+                    del self.files[path]
+                    checked.append(path)
+                continue
+
+            if previous is not None and previous.stat == stat:
+                continue
+
+            try:
+                self.files[path] = self.check(path, stat)
+            except FileNotFoundError:
+                self.files.pop(path, None)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"{path}: {e}", file=sys.stderr)
+                continue
+
+            checked.append(path)
+
+        return checked
+
+    def rescan(self) -> list:
+        """Walk the watched paths, checking new and changed files and
+        forgetting removed ones"""
+
+        # Watch every walked directory, even empty ones, so that the files
+        # created in them are seen, and the directories of watched files
+        directories = [str(root.parent) for root in self.roots if not root.is_dir()]
+        found = list(self.walk(directories))
+        removed = set(self.files.keys()).difference(found)
+
+        if self.inotify is not None:
+            for directory in set(directories):
+                self.inotify.add_watch(directory)
+
+        return self.update(itertools.chain(found, removed))
+
+    def report(self, paths: list):
+        for path in paths:
+            watched = self.files.get(path)
+            if watched is None:
+                self.out.write(f"Removed: {path}\n")
+            elif watched.handled:
+                self.out.write(format_messages(watched.messages, colorize=self.colorize))
+            elif self.args.verbose:
+                self.out.write(f"Skipping unhandled file: {path}\n")
+
+        handled = [watched for watched in self.files.values() if watched.handled]
+        failed = sum(1 for watched in handled if not watched.norm_ok())
+        if failed == 0:
+            status = "No norm violations!"
+            color = TermStyle.GREEN
+        else:
+            status = f"{failed}/{len(handled)} files with norm violations"
+            color = TermStyle.RED
+
+        if self.colorize:
+            self.out.write(f"{color}{status}{TermStyle.RESET}\n")
+        else:
+            self.out.write(f"{status}\n")
+        self.out.flush()
+
+    def norm_ok(self) -> bool:
+        return all(watched.norm_ok() for watched in self.files.values() if watched.handled)
+
+    def wait_changes(self, interval: float) -> list:
+        """Wait for changes and return the paths checked again"""
+
+        if self.inotify is None:
+            time.sleep(interval)
+            return self.rescan()
+
+        events = self.inotify.read_events()
+        # Let editors finish writing before checking
+        time.sleep(0.05)
+        events += self.inotify.read_events(0)
+
+        modified = set()
+        needs_rescan = False
+        for path, mask in events:
+            if mask & IN_ISDIR and mask & IN_CREATE:
+                self.inotify.add_watch(path)
+            if mask & MODIFIED_MASK and pathlib.Path(path) in self.files:
+                modified.add(pathlib.Path(path))
+            else:
+                needs_rescan = True
+
+        if needs_rescan:
+            return self.rescan()
+
+        return self.update(modified)
+
+    def run(self, interval: float = 1.0) -> int:
+        self.report(self.rescan())
+
+        try:
+            while True:
+                checked = self.wait_changes(interval)
+                if len(checked) > 0:
+                    self.report(checked)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.inotify is not None:
+                self.inotify.close()
+
+        return 0 if self.norm_ok() else 1
+
+def watch(args, colorize=False) -> int:
+    """Check the files given in args and check them again whenever they change"""
+
+    if args.delivery:
+        args.unnecessary = True
+        args.recursive = True
+
+    if len(args.files) == 0:
+        print("No input files", file=sys.stderr)
+        return 1
+
+    from moulinorme.__main__ import project_config
+    from moulinorme.config import ConfigError
+
+    try:
+        config = project_config(args, pathlib.Path("."))
+    except ConfigError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    return Watcher(args, colorize=colorize, config=config).run()
@@ -12,10 +12,11 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/hoot-w00t/mouli-norme",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks", "benchmarks.*"]),
     entry_points={
         "console_scripts": [
-            "moulinorme=moulinorme.__main__:main"
+            "moulinorme=moulinorme.__main__:main",
+            "moulinorme-client=moulinorme.client:main"
         ]
     },
     classifiers=[
@@ -23,5 +24,8 @@ setuptools.setup(
         "License :: OSI Approved :: GNU General Public License v3 or later (GPLv3+)",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
+    install_requires=[
+        'tomli>=1.1.0; python_version < "3.11"',
+    ],
 )
\ No newline at end of file